@@ -1,16 +1,91 @@
 from flask import Flask, jsonify
+from requests.adapters import HTTPAdapter
+import os, threading, time
 import requests
 
+BACKEND_URL = os.environ.get('BACKEND_URL', 'http://backend:5555/data')
+# (connect, read) timeouts in seconds for backend calls
+BACKEND_TIMEOUT = (float(os.environ.get('BACKEND_CONNECT_TIMEOUT', '1')),
+                   float(os.environ.get('BACKEND_READ_TIMEOUT', '2')))
+# seconds a backend /data payload is reused, 0 disables the cache
+BACKEND_CACHE_TTL = float(os.environ.get('BACKEND_CACHE_TTL', '1'))
+POOL_SIZE = int(os.environ.get('BACKEND_POOL_SIZE', '32'))
+
 app = Flask(__name__)
 
+# one session for all requests: keeps connections to the backend alive
+# instead of opening a new TCP connection per call
+session = requests.Session()
+session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
+
+cache = {'data': None, 'expires': 0.0}
+# held by the one thread fetching from the backend, never while serving
+refresh_lock = threading.Lock()
+stats = {'requests': 0, 'backend_calls': 0, 'cache_hits': 0, 'stale_hits': 0,
+         'backend_errors': 0}
+stats_lock = threading.Lock()
+
+def count(name):
+    with stats_lock:
+        stats[name] += 1
+
+def fetch():
+    count('backend_calls')
+    response = session.get(BACKEND_URL, timeout=BACKEND_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+def backend_data():
+    """Return the backend payload, fetching it at most once per TTL.
+
+    Only one thread refreshes. While it waits for the backend the others
+    get the previous payload, or wait for the refresh if there is none yet.
+    """
+    if BACKEND_CACHE_TTL <= 0:
+        return fetch()
+    data, expires = cache['data'], cache['expires']
+    if time.monotonic() < expires:
+        count('cache_hits')
+        return data
+    if data is None:
+        acquired = refresh_lock.acquire(timeout=sum(BACKEND_TIMEOUT))
+    else:
+        acquired = refresh_lock.acquire(blocking=False)
+    if not acquired:
+        if data is None:
+            raise requests.Timeout('backend refresh by another request timed out')
+        count('stale_hits')
+        return data
+    try:
+        if cache['expires'] > expires:
+            # refreshed while we waited for the lock
+            count('cache_hits')
+            return cache['data']
+        data = fetch()
+        cache['data'], cache['expires'] = data, time.monotonic() + BACKEND_CACHE_TTL
+        return data
+    finally:
+        refresh_lock.release()
+
 @app.route('/')
 def hello():
+    count('requests')
     # Internal communication with backend on port 5555
-    backend_response = requests.get('http://backend:5555/data').json()
+    try:
+        backend_response = backend_data()
+    except requests.RequestException as e:
+        count('backend_errors')
+        return jsonify({"message": "Hello World", "error": str(e)}), 502
     return jsonify({
         "message": "Hello World",
         "backend_data": backend_response
     })
 
+@app.route('/stats')
+def backend_stats():
+    # counters live in each gunicorn worker: this is the answering worker's
+    with stats_lock:
+        return jsonify(dict(stats, worker_pid=os.getpid()))
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8088)
+    app.run(host='0.0.0.0', port=8088, threaded=True)
@@ -0,0 +1,43 @@
+# gunicorn settings for the api service
+#   docker compose kill -s HUP api       -> graceful reload of all workers
+#   (with preload_app the code itself is only reloaded by a restart)
+import os
+
+# backend/gunicorn.conf.py has a copy, keep the two in sync
+def cgroup_cpus():
+    """CPUs granted to the container: cgroup quota, else the affinity mask."""
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            limit, period = f.read().split()
+            if limit != 'max':
+                quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                limit = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    cpus = len(os.sched_getaffinity(0))
+    return max(1, min(cpus, int(quota + 0.5))) if quota else cpus
+
+bind = '0.0.0.0:' + os.environ.get('PORT', '8088')
+# WEB_CONCURRENCY overrides the CPU based default
+# the api mostly waits on the backend, so each worker runs a few threads
+workers = int(os.environ.get('WEB_CONCURRENCY', '0')) or cgroup_cpus() + 1
+worker_class = 'gthread'
+threads = int(os.environ.get('WORKER_THREADS', '8'))
+# import the app once in the master, workers fork with it already loaded
+preload_app = True
+# seconds workers get to finish in-flight requests on reload or stop
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', '10'))
+keepalive = 5
+# recycle workers now and then so leaks cannot accumulate
+max_requests = 10000
+max_requests_jitter = 1000
@@ -0,0 +1,37 @@
+# gunicorn settings for the backend service
+#   docker compose kill -s HUP backend   -> graceful reload of all workers
+# The settings are explained in api/gunicorn.conf.py. cgroup_cpus() is a copy
+# of the one there, as each image is built from its own directory only.
+import os
+
+def cgroup_cpus():
+    quota = None
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            limit, period = f.read().split()
+            if limit != 'max':
+                quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                limit = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    cpus = len(os.sched_getaffinity(0))
+    return max(1, min(cpus, int(quota + 0.5))) if quota else cpus
+
+bind = '0.0.0.0:' + os.environ.get('PORT', '5555')
+# gthread like the api: the sync worker closes the connection after every
+# response, which would defeat the api's pooled keep-alive session
+workers = int(os.environ.get('WEB_CONCURRENCY', '0')) or cgroup_cpus() + 1
+worker_class = 'gthread'
+threads = int(os.environ.get('WORKER_THREADS', '4'))
+preload_app = True
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', '10'))
+keepalive = 5
+max_requests = 10000
+max_requests_jitter = 1000
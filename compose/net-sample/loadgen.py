@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Load generator for the net-sample api -> backend topology.
+
+Drives GET requests against the api with a number of concurrent clients,
+each reusing one keep-alive connection, and reports requests per second
+and latency percentiles. Standard library only.
+
+    docker compose -f compose.yaml up -d --build
+    python loadgen.py --url http://127.0.0.1:8088/ --clients 32 --duration 10
+"""
+
+import argparse, collections, http.client, json, threading, time
+from urllib.parse import urlsplit
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(values))))
+    return values[min(rank, len(values)) - 1]
+
+def client(url, deadline, latencies, errors):
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            time.sleep(0.05)
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8088/')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent connections')
+    parser.add_argument('--duration', type=float, default=10, help='seconds')
+    parser.add_argument('--json', action='store_true', help='print the raw report')
+    args = parser.parse_args()
+
+    latencies, errors = [], []
+    deadline = time.monotonic() + args.duration
+    threads = [threading.Thread(target=client, args=(args.url, deadline, latencies, errors))
+               for _ in range(args.clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    report = {
+        'requests': len(latencies),
+        'errors': dict(collections.Counter(str(e) for e in errors)),
+        'seconds': round(elapsed, 2),
+        'rps': round(len(latencies) / elapsed, 1),
+        'latency_ms': {p: round(percentile(latencies, int(p[1:])) * 1000, 2)
+                       if latencies else None for p in ('p50', 'p90', 'p99')},
+    }
+    # backend calls vs cache hits of the worker that answers this request
+    try:
+        parts = urlsplit(args.url)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=5)
+        conn.request('GET', '/stats')
+        report['api_stats'] = json.loads(conn.getresponse().read())
+    except (OSError, ValueError, http.client.HTTPException):
+        pass
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print('%d requests, %d errors in %ss: %s req/s' % (
+        report['requests'], len(errors), report['seconds'], report['rps']))
+    if errors:
+        print('errors  ' + json.dumps(report['errors']))
+    print('latency ms  ' + '  '.join('%s=%s' % item for item in report['latency_ms'].items()))
+    if 'api_stats' in report:
+        print('api worker stats  ' + json.dumps(report['api_stats']))
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,30 @@
 #!/usr/bin/env python3
 
 from http.server import BaseHTTPRequestHandler, HTTPServer
-import os, datetime
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Array
+import os, sys, signal, asyncio, datetime, gzip, resource, threading, time
+from urllib.parse import urlsplit
 
-class myServer(BaseHTTPRequestHandler):
-  def do_GET(self):
-    load = os.getloadavg()
-    html = """<!DOCTYPE html>
+# SERVER_MODE: single (one request at a time), thread (bounded thread pool),
+# async (asyncio event loop) or prefork (processes sharing the socket)
+MODE = os.environ.get('SERVER_MODE', 'single')
+WORKERS = int(os.environ.get('SERVER_WORKERS', '0')) or {
+  'thread': 16, 'prefork': os.cpu_count() or 1}.get(MODE, 1)
+PORT = int(os.environ.get('PORT', '8080'))
+# idle seconds before a persistent (keep-alive) connection is closed; in
+# thread and prefork mode an open connection holds a worker, so the default
+# there is short. A connection is closed after KEEPALIVE_REQUESTS responses,
+# letting clients waiting for a worker take turns
+KEEPALIVE_TIMEOUT = float(os.environ.get(
+  'KEEPALIVE_TIMEOUT', '5' if MODE == 'async' else '1'))
+KEEPALIVE_REQUESTS = int(os.environ.get('KEEPALIVE_REQUESTS', '100'))
+GZIP = os.environ.get('GZIP', '1') != '0'
+# seconds between background samples of date, load and process stats
+SAMPLE_INTERVAL = float(os.environ.get('SAMPLE_INTERVAL', '1'))
+
+# the page split into static byte segments around the two dynamic values
+PAGE_HEAD = b"""<!DOCTYPE html>
 <html>
   <head>
     <title>Hello world</title>
@@ -14,19 +32,315 @@ class myServer(BaseHTTPRequestHandler):
   </head>
   <body>
     <h1>Hello world: python</h1>
-    Date: {now}<br />
-    CPU usage (load): {load}
+    Date: """
+PAGE_MID = b"""<br />
+    CPU usage (load): """
+PAGE_TAIL = b"""
   </body>
-</html>""".format(now=datetime.datetime.now().astimezone(), load=load[0])
+</html>"""
+MODE_HEADER = '%s/%d' % (MODE, WORKERS)
+
+def render_page(now, load):
+  return b''.join((PAGE_HEAD, str(now).encode(), PAGE_MID,
+                   str(load).encode(), PAGE_TAIL))
+
+# latest sample, replaced as a whole by the sampler thread; handlers only
+# read it, so a request costs no syscalls for date, load or compression
+SAMPLE = {}
+
+def take_sample():
+  global SAMPLE
+  now = datetime.datetime.now().astimezone()
+  load = os.getloadavg()
+  usage = resource.getrusage(resource.RUSAGE_SELF)
+  try:
+    with open('/proc/self/statm') as f:
+      rss = int(f.read().split()[1]) * resource.getpagesize()
+  except OSError:
+    rss = usage.ru_maxrss * 1024
+  page = render_page(now, load[0])
+  SAMPLE = {
+    'load': load,
+    'time': now.timestamp(),
+    'cpu_seconds': usage.ru_utime + usage.ru_stime,
+    'rss_bytes': rss,
+    'page': page,
+    'page_gzip': gzip.compress(page, compresslevel=5) if GZIP else None,
+  }
+
+def start_sampler():
+  take_sample()
+  def loop():
+    while True:
+      time.sleep(SAMPLE_INTERVAL)
+      take_sample()
+  threading.Thread(target=loop, daemon=True).start()
+
+# request counters and latency histogram in shared memory, created before
+# any fork so prefork workers all count into the same place
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+PATHS = ('/', '/metrics', 'other')
+# layout: requests per path, latency sum, latency count, bucket counts
+METRICS = Array('d', len(PATHS) + 2 + len(BUCKETS))
+
+def observe(path, seconds):
+  slot = PATHS.index(path) if path in PATHS else len(PATHS) - 1
+  base = len(PATHS)
+  with METRICS.get_lock():
+    METRICS[slot] += 1
+    METRICS[base] += seconds
+    METRICS[base + 1] += 1
+    for i, bound in enumerate(BUCKETS):
+      if seconds <= bound:
+        METRICS[base + 2 + i] += 1
+
+def render_metrics():
+  with METRICS.get_lock():
+    values = METRICS[:]
+  base = len(PATHS)
+  sample = SAMPLE
+  lines = [
+    '# HELP hello_requests_total HTTP requests served.',
+    '# TYPE hello_requests_total counter',
+  ]
+  lines += ['hello_requests_total{path="%s"} %d' % (path, values[i])
+            for i, path in enumerate(PATHS)]
+  lines += [
+    '# HELP hello_request_duration_seconds Time spent handling a request.',
+    '# TYPE hello_request_duration_seconds histogram',
+  ]
+  lines += ['hello_request_duration_seconds_bucket{le="%s"} %d'
+            % (bound, values[base + 2 + i]) for i, bound in enumerate(BUCKETS)]
+  lines += [
+    'hello_request_duration_seconds_bucket{le="+Inf"} %d' % values[base + 1],
+    'hello_request_duration_seconds_sum %f' % values[base],
+    'hello_request_duration_seconds_count %d' % values[base + 1],
+    '# HELP hello_load1 One-minute load average of the host.',
+    '# TYPE hello_load1 gauge',
+    'hello_load1 %f' % sample['load'][0],
+    '# HELP hello_server_workers Configured worker threads or processes.',
+    '# TYPE hello_server_workers gauge',
+    'hello_server_workers{mode="%s"} %d' % (MODE, WORKERS),
+    '# HELP process_cpu_seconds_total CPU time of the answering process.',
+    '# TYPE process_cpu_seconds_total counter',
+    'process_cpu_seconds_total{pid="%d"} %f' % (os.getpid(), sample['cpu_seconds']),
+    '# HELP process_resident_memory_bytes Resident memory of the answering process.',
+    '# TYPE process_resident_memory_bytes gauge',
+    'process_resident_memory_bytes{pid="%d"} %d' % (os.getpid(), sample['rss_bytes']),
+  ]
+  return ('\n'.join(lines) + '\n').encode()
+
+def accepts_gzip(accept_encoding):
+  """True unless gzip is missing from Accept-Encoding or refused with q=0."""
+  weights = {}
+  for item in (accept_encoding or '').split(','):
+    token, _, params = item.partition(';')
+    weight = 1.0
+    for param in params.split(';'):
+      name, _, value = param.partition('=')
+      if name.strip().lower() == 'q':
+        try:
+          weight = float(value)
+        except ValueError:
+          weight = 0.0
+    weights[token.strip().lower()] = weight
+  return weights.get('gzip', weights.get('*', 0.0)) > 0
+
+def build_response(path, accept_encoding):
+  """Return (headers, body) for a path, gzipped if the client accepts it."""
+  if path == '/metrics':
+    body = render_metrics()
+    headers = [('Content-type', 'text/plain; version=0.0.4')]
+  else:
+    sample = SAMPLE
+    body = sample['page']
+    headers = [('Content-type', 'text/html'), ('X-Server-Mode', MODE_HEADER)]
+    if GZIP:
+      headers.append(('Vary', 'Accept-Encoding'))
+      if accepts_gzip(accept_encoding):
+        body = sample['page_gzip']
+        headers.append(('Content-Encoding', 'gzip'))
+  headers.append(('Content-Length', str(len(body))))
+  return headers, body
+
+# request bodies up to this size are read and skipped to keep the connection,
+# a larger or chunked body closes it after the response
+MAX_SKIPPED_BODY = 65536
+
+def skip_request_body(handler):
+  """Consume a GET/HEAD request body, a body left unread would be parsed as
+  the next request line. False if the connection has to be closed instead."""
+  length = handler.headers.get('Content-Length', '0')
+  if 'Transfer-Encoding' in handler.headers or not length.isdigit() \
+     or int(length) > MAX_SKIPPED_BODY:
+    return False
+  if int(length):
+    handler.rfile.read(int(length))
+  return True
+
+class myServer(BaseHTTPRequestHandler):
+  # HTTP/1.1 with Content-Length lets clients reuse the connection
+  protocol_version = 'HTTP/1.1'
+  timeout = KEEPALIVE_TIMEOUT
+  # headers and body are separate writes; with Nagle on, the body waits for
+  # the client's delayed ACK of the headers (~40 ms per response)
+  disable_nagle_algorithm = True
+
+  def setup(self):
+    super().setup()
+    self.served = 0
+
+  def do_GET(self):
+    self.respond(send_body=True)
+
+  def do_HEAD(self):
+    self.respond(send_body=False)
+
+  def respond(self, send_body):
+    start = time.perf_counter()
+    keep_alive = skip_request_body(self)
+    # route and count on the path alone, /metrics?x=1 is still /metrics
+    path = urlsplit(self.path).path
+    headers, body = build_response(path, self.headers.get('Accept-Encoding'))
+    self.served += 1
+    if not keep_alive or self.served >= KEEPALIVE_REQUESTS:
+      headers.append(('Connection', 'close'))
     self.send_response(200)
-    self.send_header('Content-type','text/html')
+    for name, value in headers:
+      self.send_header(name, value)
     self.end_headers()
-    self.wfile.write(bytes(html, "utf8"))
+    if send_body:
+      self.wfile.write(body)
+    observe(path, time.perf_counter() - start)
     return
 
+class PoolHTTPServer(HTTPServer):
+  """HTTPServer handing each connection to a fixed-size thread pool."""
+  def __init__(self, addr, handler, workers):
+    super().__init__(addr, handler)
+    self.pool = ThreadPoolExecutor(max_workers=workers)
+
+  def process_request(self, request, client_address):
+    self.pool.submit(self.process_request_thread, request, client_address)
+
+  def process_request_thread(self, request, client_address):
+    try:
+      self.finish_request(request, client_address)
+    except Exception:
+      self.handle_error(request, client_address)
+    finally:
+      self.shutdown_request(request)
+
+async def read_headers(reader):
+  request = {}
+  while True:
+    line = await reader.readline()
+    if line in (b'\r\n', b'\n', b''):
+      return request
+    name, _, value = line.decode('latin-1').partition(':')
+    request[name.strip().lower()] = value.strip()
+
+async def handle_async(reader, writer):
+  served = 0
+  try:
+    while True:
+      try:
+        request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+        if not request_line.strip():
+          break
+        request = await asyncio.wait_for(read_headers(reader), KEEPALIVE_TIMEOUT)
+      except asyncio.TimeoutError:
+        break
+
+      start = time.perf_counter()
+      parts = request_line.decode('latin-1').split()
+      method = parts[0] if parts else ''
+      path = urlsplit(parts[1]).path if len(parts) > 1 else '/'
+      if method not in ('GET', 'HEAD'):
+        # like BaseHTTPRequestHandler's send_error: answer and close
+        writer.write(b'HTTP/1.1 501 Not Implemented\r\n'
+                     b'Content-Length: 0\r\nConnection: close\r\n\r\n')
+        await writer.drain()
+        break
+      keep_alive = request_line.rstrip().endswith(b'HTTP/1.1')
+      connection = request.get('connection', '').lower()
+      if connection == 'close':
+        keep_alive = False
+      elif connection == 'keep-alive':
+        keep_alive = True
+      served += 1
+      if served >= KEEPALIVE_REQUESTS:
+        keep_alive = False
+
+      # a body left unread would be parsed as the next request line
+      length = request.get('content-length', '0')
+      if 'transfer-encoding' in request or not length.isdigit() \
+         or int(length) > MAX_SKIPPED_BODY:
+        keep_alive = False
+      elif int(length):
+        try:
+          await asyncio.wait_for(reader.readexactly(int(length)), KEEPALIVE_TIMEOUT)
+        except asyncio.TimeoutError:
+          break
+
+      headers, body = build_response(path, request.get('accept-encoding'))
+      headers.append(('Connection', 'keep-alive' if keep_alive else 'close'))
+      head = 'HTTP/1.1 200 OK\r\n' + ''.join(
+        '%s: %s\r\n' % header for header in headers) + '\r\n'
+      writer.write(head.encode('latin-1') + (body if method == 'GET' else b''))
+      await writer.drain()
+      observe(path, time.perf_counter() - start)
+      if not keep_alive:
+        break
+  except (ConnectionError, asyncio.IncompleteReadError):
+    pass
+  finally:
+    writer.close()
+
+async def serve_async():
+  server = await asyncio.start_server(handle_async, '', PORT, backlog=1024)
+  async with server:
+    await server.serve_forever()
+
+def serve_prefork(httpd):
+  children = []
+  for _ in range(WORKERS):
+    pid = os.fork()
+    if pid == 0:
+      signal.signal(signal.SIGTERM, signal.SIG_DFL)
+      # threads do not survive fork, every worker samples for itself
+      start_sampler()
+      try:
+        httpd.serve_forever()
+      finally:
+        os._exit(0)
+    children.append(pid)
+
+  def stop(signum, frame):
+    for pid in children:
+      os.kill(pid, signal.SIGTERM)
+    sys.exit(0)
+  signal.signal(signal.SIGTERM, stop)
+  signal.signal(signal.SIGINT, stop)
+  for pid in children:
+    os.waitpid(pid, 0)
+
 def run():
-  addr = ('', 8080)
-  httpd = HTTPServer(addr, myServer)
-  httpd.serve_forever()
+  print('serving on port %d, mode=%s, workers=%d' % (PORT, MODE, WORKERS),
+        flush=True)
+  addr = ('', PORT)
+  if MODE != 'prefork':
+    start_sampler()
+  if MODE == 'async':
+    asyncio.run(serve_async())
+  elif MODE == 'thread':
+    PoolHTTPServer(addr, myServer, WORKERS).serve_forever()
+  elif MODE == 'prefork':
+    # bind once in the parent, the forked workers accept on the same socket
+    serve_prefork(HTTPServer(addr, myServer))
+  else:
+    # one connection at a time: a kept-alive client would block everyone else
+    myServer.protocol_version = 'HTTP/1.0'
+    HTTPServer(addr, myServer).serve_forever()
 
 run()
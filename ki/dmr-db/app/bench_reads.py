@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Read throughput check for the replica routing in main.py.
+
+Runs one SELECT from many threads through the same pools and routing as
+/api/query, without the LLM, and reports queries per second, latency
+percentiles and how the reads were spread over primary and replicas. Run it
+once without and once with replicas to see how reads scale:
+
+    docker compose exec webapp python bench_reads.py --threads 16 --duration 10
+    DATABASE_REPLICAS=mariadb-replica docker compose --profile replicas up -d
+    docker compose exec webapp python bench_reads.py --threads 16 --duration 10
+
+The default query burns server CPU (BENCHMARK) to stand in for an expensive
+analytic SELECT on the small demo data set.
+"""
+
+import argparse
+import json
+import threading
+import time
+
+import main as webapp
+
+DEFAULT_SQL = (
+    "SELECT g.name, COUNT(*) AS movies, BENCHMARK(20000, MD5(g.name)) AS burn "
+    "FROM movies m JOIN genres g ON g.id = m.genre_id GROUP BY g.name"
+)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(values))))
+    return values[min(rank, len(values)) - 1]
+
+
+def worker(sql, deadline, latencies, errors):
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            webapp.execute_sql_query_rows(sql)
+        except Exception as e:
+            errors.append(str(getattr(e, "detail", e)))
+            time.sleep(0.05)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def monitor(deadline):
+    """Stand-in for the app's background replica checks."""
+    while time.monotonic() < deadline:
+        webapp.refresh_replica_status()
+        time.sleep(webapp.REPLICA_CHECK_INTERVAL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--sql", default=DEFAULT_SQL)
+    parser.add_argument("--json", action="store_true", help="print the raw report")
+    args = parser.parse_args()
+
+    # the first lag check decides whether replicas take part at all
+    webapp.refresh_replica_status()
+    latencies, errors = [], []
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(args.sql, deadline, latencies, errors))
+        for _ in range(args.threads)
+    ]
+    threads.append(threading.Thread(target=monitor, args=(deadline,), daemon=True))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads[:-1]:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    report = {
+        "queries": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 2),
+        "qps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            p: round(percentile(latencies, int(p[1:])) * 1000, 2) if latencies else None
+            for p in ("p50", "p90", "p99")
+        },
+        "pools": [
+            pool.snapshot() for pool in [webapp.PRIMARY_POOL, *webapp.REPLICA_POOLS]
+        ],
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(
+        f"{report['queries']} queries, {report['errors']} errors in "
+        f"{report['seconds']}s: {report['qps']} q/s"
+    )
+    if errors:
+        print(f"first error: {errors[0]}")
+    print(
+        "latency ms  "
+        + "  ".join(f"{key}={value}" for key, value in report["latency_ms"].items())
+    )
+    for pool in report["pools"]:
+        state = "ok" if pool["healthy"] else pool["error"]
+        print(f"  {pool['name']:<24}{pool['served']:>8} queries  {state}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,180 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+import asyncio
 import httpx
 import pymysql
+import pymysql.constants.CR
+from fastapi.concurrency import run_in_threadpool
 from openai import AsyncOpenAI
 import os
+import csv
+import datetime
+import gzip
+import hashlib
+import io
+import itertools
+import mimetypes
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from urllib.parse import quote
 from typing import Optional, List, Dict, Any, Tuple
 import json
+import math
+import re
 import sys
 
+try:
+    import brotli
+except ImportError:  # optional, gzip variants are always built
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the json module
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional, the Arrow result format is then unavailable
+    pa = None
+
 app = FastAPI(title="Natural Language Movie Database Query API")
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Static assets are read once at startup and kept in memory together with
+# precompressed gzip/brotli variants. Besides its own name every asset is
+# served under a content-hashed name (style.<hash>.css); index.html links to
+# those, so they can be cached forever while the page itself is revalidated.
+STATIC_DIR = "static"
+STATIC_IMMUTABLE = "public, max-age=31536000, immutable"
+STATIC_REVALIDATE = "no-cache"
+STATIC_ASSETS: Dict[str, Dict[str, Any]] = {}
+
+FALLBACK_HTML = """
+        <html>
+            <body>
+                <h1>Natural Language Movie Database Query</h1>
+                <p>Frontend not found. Please ensure static/index.html exists.</p>
+            </body>
+        </html>
+        """
+
+
+def _static_asset(body: bytes, media_type: str, cache_control: str) -> Dict[str, Any]:
+    """Fingerprint an asset and keep the compressed variants that pay off."""
+    variants = {"identity": body}
+    gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+    if len(gzipped) < len(body):
+        variants["gzip"] = gzipped
+    if brotli is not None:
+        compressed = brotli.compress(body, quality=11)
+        if len(compressed) < len(body):
+            variants["br"] = compressed
+    return {
+        "hash": hashlib.sha256(body).hexdigest()[:16],
+        "media_type": media_type,
+        "cache_control": cache_control,
+        "variants": variants,
+    }
+
+
+def load_static_assets() -> None:
+    """Read, fingerprint and precompress everything below STATIC_DIR."""
+    assets: Dict[str, Dict[str, Any]] = {}
+    hashed_urls: Dict[str, str] = {}
+    for root, _, files in os.walk(STATIC_DIR):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            url = "/static/" + os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+            if url == "/static/index.html":
+                continue
+            with open(path, "rb") as f:
+                body = f.read()
+            media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            asset = _static_asset(body, media_type, STATIC_REVALIDATE)
+            stem, ext = os.path.splitext(url)
+            hashed_urls[url] = f"{stem}.{asset['hash']}{ext}"
+            assets[url] = asset
+            assets[hashed_urls[url]] = {**asset, "cache_control": STATIC_IMMUTABLE}
+
+    try:
+        with open(os.path.join(STATIC_DIR, "index.html"), "r") as f:
+            html = f.read()
+    except FileNotFoundError:
+        html = FALLBACK_HTML
+    for url, hashed_url in hashed_urls.items():
+        html = html.replace(f'"{url}"', f'"{hashed_url}"')
+    assets["/"] = _static_asset(html.encode(), "text/html", STATIC_REVALIDATE)
+    assets["/static/index.html"] = assets["/"]
+
+    STATIC_ASSETS.clear()
+    STATIC_ASSETS.update(assets)
+
+
+def parse_quality_list(value: str) -> Dict[str, float]:
+    """Tokens of an Accept-style header with their q-values (default 1)."""
+    weights: Dict[str, float] = {}
+    for part in value.split(","):
+        token, *params = part.split(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, number = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        weights[token] = quality
+    return weights
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an ETag against an If-None-Match list."""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"') == etag.strip('"'):
+            return True
+    return False
+
+
+def static_response(request: Request, asset: Dict[str, Any]) -> Response:
+    """Serve an in-memory asset, honouring If-None-Match and Accept-Encoding."""
+    accepted = parse_quality_list(request.headers.get("accept-encoding", ""))
+    encoding = next(
+        (
+            name
+            for name in ("br", "gzip")
+            if accepted.get(name, accepted.get("*", 0.0)) > 0
+            and name in asset["variants"]
+        ),
+        "identity",
+    )
+    suffix = "" if encoding == "identity" else f"-{encoding}"
+    headers = {
+        "Cache-Control": asset["cache_control"],
+        "ETag": f'"{asset["hash"]}{suffix}"',
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if suffix:
+        headers["Content-Encoding"] = encoding
+    body = asset["variants"][encoding]
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(len(body))
+        return Response(media_type=asset["media_type"], headers=headers)
+    return Response(body, media_type=asset["media_type"], headers=headers)
+
 
 # Database configuration
 DB_CONFIG = {
@@ -26,12 +187,188 @@ DB_CONFIG = {
     "cursorclass": pymysql.cursors.DictCursor,
 }
 
+# Read replicas for the generated SELECTs, "host[:port],..." with the primary's
+# credentials. Reads go to the healthy replica with the fewest queries in
+# flight; without a usable replica they go to the primary.
+DATABASE_REPLICAS = [
+    host.strip()
+    for host in os.getenv("DATABASE_REPLICAS", "").split(",")
+    if host.strip()
+]
+DB_CONNECT_TIMEOUT = int(os.getenv("DATABASE_CONNECT_TIMEOUT", "5"))
+DB_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "10"))
+# idle pooled connections older than this are pinged before reuse
+DB_POOL_RECYCLE = float(os.getenv("DATABASE_POOL_RECYCLE", "60"))
+REPLICA_MAX_LAG = float(os.getenv("DATABASE_REPLICA_MAX_LAG", "5"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("DATABASE_REPLICA_CHECK_INTERVAL", "5"))
+# client errors meaning the server is unreachable, not that the SQL is wrong
+CONNECTION_ERRORS = {
+    pymysql.constants.CR.CR_CONNECTION_ERROR,
+    pymysql.constants.CR.CR_CONN_HOST_ERROR,
+    pymysql.constants.CR.CR_SERVER_GONE_ERROR,
+    pymysql.constants.CR.CR_SERVER_LOST,
+}
+
+
+class ConnectionPool:
+    """Reusable connections to one MariaDB server plus its routing state."""
+
+    def __init__(self, name: str, host: str, port: int, replica: bool):
+        self.name = name
+        self.replica = replica
+        self.config = {
+            **DB_CONFIG,
+            "host": host,
+            "port": port,
+            "autocommit": True,
+            "connect_timeout": DB_CONNECT_TIMEOUT,
+        }
+        self.idle: "queue.LifoQueue[Tuple[Any, float]]" = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(DB_POOL_SIZE)
+        self.outstanding = 0
+        self.served = 0
+        self.last_pick = 0
+        # lag checks use their own connection, see monitor_connection()
+        self.monitor: Any = None
+        # replicas start unusable until the first lag check passes
+        self.status: Dict[str, Any] = {
+            "healthy": not replica,
+            "lag_seconds": None,
+            "error": None,
+            "last_check": None,
+        }
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, returned to the pool afterwards if still open."""
+        if not self.slots.acquire(timeout=DB_POOL_TIMEOUT):
+            raise HTTPException(
+                status_code=503, detail=f"No free connection to {self.name}"
+            )
+        connection = None
+        try:
+            try:
+                connection, idle_since = self.idle.get_nowait()
+                if time.monotonic() - idle_since > DB_POOL_RECYCLE:
+                    connection.ping(reconnect=True)
+            except queue.Empty:
+                connection = pymysql.connect(**self.config)
+            yield connection
+        finally:
+            # a failed statement leaves the connection open and reusable,
+            # a lost server closes it
+            if connection is not None and connection.open:
+                self.idle.put((connection, time.monotonic()))
+            self.slots.release()
+
+    def monitor_connection(self):
+        """The connection for health checks, kept outside the pool slots.
+
+        Checks then still run when queries hold every slot, and never take
+        a slot from a query.
+        """
+        if self.monitor is None or not self.monitor.open:
+            self.monitor = pymysql.connect(
+                **self.config, read_timeout=DB_CONNECT_TIMEOUT
+            )
+        else:
+            self.monitor.ping(reconnect=True)
+        return self.monitor
+
+    def close_monitor(self) -> None:
+        if self.monitor is not None:
+            try:
+                self.monitor.close()
+            except Exception:
+                pass
+            self.monitor = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "replica": self.replica,
+            "outstanding": self.outstanding,
+            "served": self.served,
+            **self.status,
+        }
+
+
+def _parse_host(value: str) -> Tuple[str, int]:
+    host, _, port = value.partition(":")
+    return host, int(port or DB_CONFIG["port"])
+
+
+PRIMARY_POOL = ConnectionPool(
+    "primary", DB_CONFIG["host"], DB_CONFIG["port"], replica=False
+)
+REPLICA_POOLS = [
+    ConnectionPool(name, *_parse_host(name), replica=True) for name in DATABASE_REPLICAS
+]
+ROUTING_LOCK = threading.Lock()
+ROUTING_SEQUENCE = itertools.count(1)
+
+
+def _acquire_read_pool() -> ConnectionPool:
+    """Least outstanding requests over the usable replicas, else the primary."""
+    with ROUTING_LOCK:
+        candidates = [pool for pool in REPLICA_POOLS if pool.status["healthy"]]
+        # ties go to the pool picked longest ago, i.e. round robin
+        pool = min(
+            candidates or [PRIMARY_POOL], key=lambda p: (p.outstanding, p.last_pick)
+        )
+        pool.outstanding += 1
+        pool.served += 1
+        pool.last_pick = next(ROUTING_SEQUENCE)
+        return pool
+
+
+def _release_read_pool(pool: ConnectionPool) -> None:
+    with ROUTING_LOCK:
+        pool.outstanding -= 1
+
+
+def check_replica(pool: ConnectionPool) -> None:
+    """Record whether a replica replicates and how far it is behind."""
+    error = None
+    lag = None
+    try:
+        connection = pool.monitor_connection()
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute("SHOW SLAVE STATUS")
+            replication = cursor.fetchone()
+        if not replication:
+            error = "replication is not configured"
+        elif replication.get("Seconds_Behind_Master") is None:
+            error = (
+                "replication stopped (IO: {Slave_IO_Running}, "
+                "SQL: {Slave_SQL_Running})".format(**replication)
+            )
+        else:
+            lag = float(replication["Seconds_Behind_Master"])
+            if lag > REPLICA_MAX_LAG:
+                error = f"lagging {lag:.0f}s behind the primary"
+    except Exception as e:
+        error = f"unreachable: {e}"
+        pool.close_monitor()
+    pool.status.update(
+        healthy=error is None, lag_seconds=lag, error=error, last_check=time.time()
+    )
+
+
+def refresh_replica_status() -> None:
+    for pool in REPLICA_POOLS:
+        check_replica(pool)
+
+
 # Model Runner configuration
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.1"))
 LLM_TIMEOUT = float(
     os.getenv("LLM_TIMEOUT", "120.0")
 )  # Default 120 seconds (2 minutes)
 LLM_SUMMARY_ROW_LIMIT = int(os.getenv("LLM_SUMMARY_ROW_LIMIT", "15"))
+LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() in ("1", "true", "yes")
+LLM_WARMUP_RETRY = float(os.getenv("LLM_WARMUP_RETRY", "10"))
 
 
 def _build_model_entry(prefix: str) -> Optional[Dict[str, str]]:
@@ -78,6 +415,91 @@ def get_llm_config(model_name: Optional[str]) -> Tuple[str, Dict[str, str]]:
     return default_key, AVAILABLE_LLM_MODELS[default_key]
 
 
+# Warm-up state and prompt processing ("prefill") timings per model ID.
+# llama.cpp reports prompt_ms and the tokens it took from its prefix cache
+# with every response; other servers only give the total latency.
+LLM_STATS: Dict[str, Dict[str, Any]] = {
+    config["model_id"]: {
+        "warmup": "pending" if LLM_WARMUP else "disabled",
+        "warmup_ms": None,
+        "warmup_error": None,
+        "requests": 0,
+        "latency_ms": 0.0,
+        "prefill_reported": 0,
+        "prefill_ms": 0.0,
+        "last_prefill_ms": None,
+        "prompt_tokens": 0,
+        "cached_tokens": 0,
+    }
+    for config in AVAILABLE_LLM_MODELS.values()
+}
+
+
+# One client per model, created on first use and closed at shutdown, so the
+# connections to each Model Runner are reused across requests.
+LLM_CLIENTS: Dict[str, AsyncOpenAI] = {}
+
+
+def llm_client(llm_config: Dict[str, str]) -> AsyncOpenAI:
+    """The shared client for a model."""
+    client = LLM_CLIENTS.get(llm_config["model_id"])
+    if client is None:
+        client = LLM_CLIENTS[llm_config["model_id"]] = AsyncOpenAI(
+            base_url=llm_config["url"], timeout=LLM_TIMEOUT, api_key="not_needed"
+        )
+    return client
+
+
+def record_llm_timings(model_id: str, response: Any, latency: float) -> None:
+    """Add one response's latency and prefill figures to LLM_STATS."""
+    stats = LLM_STATS.get(model_id)
+    if stats is None:
+        return
+    stats["requests"] += 1
+    stats["latency_ms"] += latency * 1000
+    timings = (getattr(response, "model_extra", None) or {}).get("timings") or {}
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = timings.get("cache_n") or getattr(details, "cached_tokens", None) or 0
+    stats["cached_tokens"] += cached
+    if timings.get("prompt_ms") is not None:
+        stats["prefill_reported"] += 1
+        stats["prefill_ms"] += timings["prompt_ms"]
+        stats["last_prefill_ms"] = round(timings["prompt_ms"], 1)
+        stats["prompt_tokens"] += timings.get("prompt_n") or 0
+        print(
+            f"DEBUG: Prefill {timings['prompt_ms']:.1f} ms for "
+            f"{timings.get('prompt_n')} prompt tokens, {cached} from cache",
+            file=sys.stderr,
+        )
+
+
+def llm_stats_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Per-model warm-up state and average latency and prefill time."""
+    snapshot = {}
+    for model_id, stats in LLM_STATS.items():
+        requests, reported = stats["requests"], stats["prefill_reported"]
+        snapshot[model_id] = {
+            key: stats[key]
+            for key in (
+                "warmup",
+                "warmup_ms",
+                "warmup_error",
+                "requests",
+                "last_prefill_ms",
+                "prompt_tokens",
+                "cached_tokens",
+            )
+        }
+        snapshot[model_id]["avg_latency_ms"] = (
+            round(stats["latency_ms"] / requests, 1) if requests else None
+        )
+        snapshot[model_id]["avg_prefill_ms"] = (
+            round(stats["prefill_ms"] / reported, 1) if reported else None
+        )
+    return snapshot
+
+
 class QueryRequest(BaseModel):
     query: str
     model: Optional[str] = None
@@ -103,54 +525,356 @@ def get_db_connection():
         )
 
 
-def get_database_schema() -> str:
-    """
-    Get a lightweight schema description directly from INFORMATION_SCHEMA.
+# Schema retrieval: the catalog is read once (and again after SCHEMA_INDEX_TTL)
+# and indexed by the terms in table/column names, comments and foreign keys.
+# Each prompt then only carries the tables that match the question, the
+# tables needed to join them, and as many neighbours as the budget allows.
+SCHEMA_TOKEN_BUDGET = int(os.getenv("SCHEMA_TOKEN_BUDGET", "1200"))
+SCHEMA_CHARS_PER_TOKEN = float(os.getenv("SCHEMA_CHARS_PER_TOKEN", "3.5"))
+SCHEMA_INDEX_TTL = float(os.getenv("SCHEMA_INDEX_TTL", "300"))
+# question words that say nothing about which tables are meant
+SCHEMA_STOPWORDS = set(
+    """a about above all also an and any are as at be below between by can did do
+    does each every find for from get give has have how i in is it list many me
+    most much my of on or our per show than that the their them there these this
+    those to top was were what when where which who whose with""".split()
+)
+# how much a term counts depending on where it occurs in a table
+SCHEMA_FIELD_WEIGHTS = {"table": 3.0, "column": 2.0, "comment": 1.0}
+SCHEMA_INDEX: Dict[str, Any] = {"tables": {}, "built": None, "error": None}
+SCHEMA_INDEX_LOCK = threading.Lock()
+
+
+def _schema_stem(word: str) -> str:
+    """Crude suffix stripping so actors/actor and rated/rating meet."""
+    for suffix, replacement in (("ies", "y"), ("ing", ""), ("ed", ""), ("s", "")):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)] + replacement
+    return word
+
+
+def schema_terms(text: str) -> List[str]:
+    """Lowercase stems of the words in a name, comment or question."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text or "").lower()
+    return [
+        _schema_stem(word)
+        for word in re.findall(r"[a-z0-9]+", text)
+        if word not in SCHEMA_STOPWORDS and len(word) > 1
+    ]
 
-    We only need table and column names (plus their MySQL column types) to give
-    the LLM enough context for SQL generation, so keep this intentionally simple.
-    """
-    connection = None
-    try:
-        connection = get_db_connection()
-        schema_parts = ["Database Schema:\n"]
 
+def _trigrams(term: str) -> set:
+    padded = f" {term} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def load_schema_catalog() -> Dict[str, Dict[str, Any]]:
+    """Tables with their comment, columns and foreign keys from INFORMATION_SCHEMA."""
+    connection = get_db_connection()
+    try:
         with connection.cursor() as cursor:
             cursor.execute(
                 """
-                SELECT
-                    TABLE_NAME,
-                    COLUMN_NAME,
-                    COLUMN_TYPE
+                SELECT TABLE_NAME, TABLE_COMMENT
+                FROM INFORMATION_SCHEMA.TABLES
+                WHERE TABLE_SCHEMA = %s
+                ORDER BY TABLE_NAME
+                """,
+                (DB_CONFIG["database"],),
+            )
+            tables = cursor.fetchall()
+            cursor.execute(
+                """
+                SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, COLUMN_KEY, COLUMN_COMMENT
                 FROM INFORMATION_SCHEMA.COLUMNS
                 WHERE TABLE_SCHEMA = %s
                 ORDER BY TABLE_NAME, ORDINAL_POSITION
                 """,
                 (DB_CONFIG["database"],),
             )
-            rows = cursor.fetchall()
+            columns = cursor.fetchall()
+            cursor.execute(
+                """
+                SELECT TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME,
+                       REFERENCED_COLUMN_NAME
+                FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+                WHERE TABLE_SCHEMA = %s AND REFERENCED_TABLE_NAME IS NOT NULL
+                """,
+                (DB_CONFIG["database"],),
+            )
+            foreign_keys = cursor.fetchall()
+    finally:
+        connection.close()
+
+    catalog = {
+        row["TABLE_NAME"]: {
+            "comment": row["TABLE_COMMENT"] or "",
+            "columns": [],
+            "references": {},
+        }
+        for row in tables
+    }
+    for row in columns:
+        table = catalog.setdefault(
+            row["TABLE_NAME"], {"comment": "", "columns": [], "references": {}}
+        )
+        table["columns"].append(
+            {
+                "name": row["COLUMN_NAME"],
+                "type": row["COLUMN_TYPE"],
+                "key": row["COLUMN_KEY"] or "",
+                "comment": row["COLUMN_COMMENT"] or "",
+            }
+        )
+    for row in foreign_keys:
+        if row["TABLE_NAME"] in catalog:
+            catalog[row["TABLE_NAME"]]["references"][row["COLUMN_NAME"]] = (
+                row["REFERENCED_TABLE_NAME"],
+                row["REFERENCED_COLUMN_NAME"],
+            )
+    return catalog
+
+
+def build_schema_index(catalog: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Weighted terms per table, their IDF and the foreign-key graph."""
+    tables: Dict[str, Dict[str, Any]] = {}
+    for name, table in catalog.items():
+        weights: Dict[str, float] = {}
+
+        def add(text: str, field: str) -> None:
+            for term in schema_terms(text):
+                weights[term] = max(weights.get(term, 0.0), SCHEMA_FIELD_WEIGHTS[field])
+
+        add(name, "table")
+        add(table["comment"], "comment")
+        for column in table["columns"]:
+            add(column["name"], "column")
+            add(column["comment"], "comment")
+        # a table pointing at genres is about genres, too
+        for target, _ in table["references"].values():
+            add(target, "column")
+        tables[name] = {
+            **table,
+            "terms": weights,
+            "neighbours": set(),
+            "lines": _render_table(name, table),
+            "column_terms": [set(schema_terms(c["name"])) for c in table["columns"]],
+        }
 
-        current_table = None
-        for row in rows:
-            table_name = row["TABLE_NAME"]
-            column_name = row["COLUMN_NAME"]
-            column_type = row["COLUMN_TYPE"]
+    for name, table in tables.items():
+        for target, _ in table["references"].values():
+            if target in tables and target != name:
+                table["neighbours"].add(target)
+                tables[target]["neighbours"].add(name)
+
+    document_frequency: Dict[str, int] = {}
+    for table in tables.values():
+        for term in table["terms"]:
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+    idf = {
+        term: math.log(1 + len(tables) / count)
+        for term, count in document_frequency.items()
+    }
+    trigrams = {term: _trigrams(term) for term in idf}
+    return {"tables": tables, "idf": idf, "trigrams": trigrams}
+
+
+def ensure_schema_index() -> Dict[str, Any]:
+    """Return the schema index, (re)building it when missing or expired."""
+    built = SCHEMA_INDEX["built"]
+    if built is not None and time.time() - built < SCHEMA_INDEX_TTL:
+        return SCHEMA_INDEX
+    with SCHEMA_INDEX_LOCK:
+        if SCHEMA_INDEX["built"] is built:
+            try:
+                SCHEMA_INDEX.update(
+                    build_schema_index(load_schema_catalog()),
+                    built=time.time(),
+                    error=None,
+                )
+            except Exception as e:
+                # keep serving the previous index if there is one
+                SCHEMA_INDEX["error"] = str(e)
+                if built is None:
+                    raise
+    return SCHEMA_INDEX
 
-            if table_name != current_table:
-                if current_table is not None:
-                    schema_parts.append("")  # blank line between tables
-                schema_parts.append(f"    Table: {table_name}")
-                current_table = table_name
 
-            schema_parts.append(f"    - {column_name} ({column_type})")
+def rank_tables(question: str, index: Dict[str, Any]) -> List[Tuple[float, str]]:
+    """Tables scored by the IDF-weighted schema terms the question mentions.
 
-        return "\n".join(schema_parts).strip()
+    Words without an exact match count with their best similarity to a schema
+    term, if that is at least 0.6: the trigram overlap, or for a word that is
+    the start of a longer term (directed, stemmed to direct -> director) the
+    share of the term it covers.
+    """
+    matched: Dict[str, float] = {}
+    for word in schema_terms(question):
+        if word in index["idf"]:
+            matched[word] = 1.0
+            continue
+        grams = _trigrams(word)
+        best, similarity = None, 0.0
+        for term, term_grams in index["trigrams"].items():
+            score = len(grams & term_grams) / len(grams | term_grams)
+            if len(word) >= 4 and term.startswith(word):
+                score = max(score, len(word) / len(term))
+            if score > similarity:
+                best, similarity = term, score
+        if best is not None and similarity >= 0.6:
+            matched[best] = max(matched.get(best, 0.0), similarity)
+
+    ranking = []
+    for name, table in index["tables"].items():
+        score = sum(
+            similarity * index["idf"][term] * table["terms"][term]
+            for term, similarity in matched.items()
+            if term in table["terms"]
+        )
+        if score > 0:
+            ranking.append((round(score, 3), name))
+    ranking.sort(key=lambda item: (-item[0], item[1]))
+    return ranking
+
+
+def _join_tree(tables: Dict[str, Any], start: str) -> Dict[str, Optional[str]]:
+    """Breadth-first search over foreign keys: each reachable table's predecessor."""
+    previous: Dict[str, Optional[str]] = {start: None}
+    frontier = [start]
+    while frontier:
+        following = []
+        for name in frontier:
+            for neighbour in sorted(tables[name]["neighbours"]):
+                if neighbour not in previous:
+                    previous[neighbour] = name
+                    following.append(neighbour)
+        frontier = following
+    return previous
+
+
+def _join_path(previous: Dict[str, Optional[str]], goal: str) -> List[str]:
+    """Shortest chain of tables from the search start to goal, both included."""
+    if goal not in previous:
+        return [goal]
+    path = [goal]
+    while previous[path[-1]] is not None:
+        path.append(previous[path[-1]])
+    return path[::-1]
+
+
+def _render_table(name: str, table: Dict[str, Any]) -> List[str]:
+    lines = [
+        f"    Table: {name}" + (f" -- {table['comment']}" if table["comment"] else "")
+    ]
+    for column in table["columns"]:
+        line = f"    - {column['name']} ({column['type']})"
+        if column["name"] in table["references"]:
+            line += " -> {}.{}".format(*table["references"][column["name"]])
+        if column["comment"]:
+            line += f" -- {column['comment']}"
+        lines.append(line)
+    return lines
+
+
+def _render_table_compact(table: Dict[str, Any], question_terms: set) -> List[str]:
+    """Keys and the columns the question mentions, for very wide tables."""
+    lines = table["lines"]
+    kept = [lines[0]]
+    for column, terms, line in zip(table["columns"], table["column_terms"], lines[1:]):
+        if (
+            column["key"]
+            or column["name"] in table["references"]
+            or question_terms & terms
+        ):
+            kept.append(line)
+    omitted = len(lines) - len(kept)
+    if omitted:
+        kept.append(f"    - ... {omitted} more columns")
+    return kept
+
+
+def select_schema(question: str, index: Dict[str, Any]) -> Dict[str, Any]:
+    """Pick and render the tables for a question within SCHEMA_TOKEN_BUDGET."""
+    tables = index["tables"]
+    ranking = rank_tables(question, index)
+    question_terms = set(schema_terms(question))
+    budget = SCHEMA_TOKEN_BUDGET * SCHEMA_CHARS_PER_TOKEN
+
+    # matching tables first, each followed by the tables joining it to the
+    # best match; then foreign-key neighbours by distance; unrelated tables
+    # only when nothing matched
+    order: List[str] = []
+    if ranking:
+        previous = _join_tree(tables, ranking[0][1])
+        for _, name in ranking:
+            order.extend(t for t in _join_path(previous, name) if t not in order)
+    core = set(order)
+    frontier = list(order)
+    while frontier:
+        following = []
+        for name in frontier:
+            for neighbour in sorted(tables[name]["neighbours"]):
+                if neighbour not in order:
+                    order.append(neighbour)
+                    following.append(neighbour)
+        frontier = following
+    if not ranking:
+        order.extend(sorted(tables))
+
+    blocks: Dict[str, str] = {}
+    joins: List[str] = []
+    shown: List[str] = []
+    # header, "more tables" note and "Join paths:" heading
+    used = 80
+    for name in order:
+        if shown and budget - used < len(tables[name]["lines"][0]) * 2:
+            break
+        table = tables[name]
+        new_joins = [
+            f"    {name}.{column} = {target}.{target_column}"
+            for column, (target, target_column) in table["references"].items()
+            if target in shown or target == name
+        ] + [
+            f"    {other}.{column} = {name}.{target_column}"
+            for other in shown
+            for column, (target, target_column) in tables[other]["references"].items()
+            if target == name
+        ]
+        block = table["lines"]
+        size = len("\n".join(block + new_joins)) + 3
+        if used + size > budget and (name in core or not shown):
+            block = _render_table_compact(table, question_terms)
+            size = len("\n".join(block + new_joins)) + 3
+        if used + size > budget and shown:
+            if name in core:
+                continue
+            break
+        blocks[name] = "\n".join(block)
+        joins.extend(new_joins)
+        shown.append(name)
+        used += size
+
+    # rendered by name, not by rank: questions that pick the same tables get
+    # the same text, which keeps the prompt prefix cacheable
+    text = "Database Schema:\n\n" + "\n\n".join(blocks[name] for name in sorted(blocks))
+    if len(shown) < len(tables):
+        text += f"\n\n    ({len(tables) - len(shown)} more tables not shown)"
+    if joins:
+        text += "\n\nJoin paths:\n" + "\n".join(sorted(joins))
+    return {"text": text, "tables": shown, "ranking": ranking}
+
+
+def get_database_schema(question: str = "") -> str:
+    """
+    Describe the tables relevant to a question for the SQL prompt.
 
+    Tables unrelated to the question are left out; a question that matches
+    no table gets all of them, as far as the token budget allows.
+    """
+    try:
+        return select_schema(question, ensure_schema_index())["text"]
     except Exception as e:
         return f"Database Schema:\n\nError retrieving schema: {str(e)}"
-    finally:
-        if connection:
-            connection.close()
 
 
 async def call_llm(
@@ -166,14 +890,16 @@ async def call_llm(
             f"DEBUG: Using LLM_URL: {llm_config['url']} | model: {llm_config['model_id']}",
             file=sys.stderr,
         )
-        client = AsyncOpenAI(
-            base_url=llm_config["url"], timeout=LLM_TIMEOUT, api_key="not_needed"
-        )
+        client = llm_client(llm_config)
+        started = time.perf_counter()
         response = await client.chat.completions.create(
             model=llm_config["model_id"],
             messages=messages,
             temperature=float(temperature),
         )
+        record_llm_timings(
+            llm_config["model_id"], response, time.perf_counter() - started
+        )
         print(f"DEBUG: LLM response: {response}", file=sys.stderr)
 
         choices = getattr(response, "choices", None) or []
@@ -213,19 +939,9 @@ def sanitize_sql(sql_query: str) -> str:
     return sql_query
 
 
-async def generate_sql_from_natural_language(
-    query: str, llm_config: Dict[str, str]
-) -> str:
-    """Use Docker Model Runner to convert natural language to SQL."""
-    print(f"DEBUG: Generating SQL from natural language: {query}", file=sys.stderr)
-    schema = get_database_schema()
-    print(f"DEBUG: Database schema: {schema}", file=sys.stderr)
-
-    prompt = f"""You are a SQL expert. Given the following database schema, convert the natural language query into a valid SQL query.
-
-{schema}
-
-Natural language query: {query}
+# Static part of the SQL prompt. It comes first and the question last, so
+# the Model Runner can reuse the processed prefix from the previous request.
+SQL_SYSTEM_PROMPT = """You are a SQL expert. Given the database schema below, convert the natural language query into a valid SQL query.
 
 Return ONLY the SQL query, nothing else. Do not include explanations, markdown formatting, or any other text. Just the SQL query.
 Note that this version of MariaDB doesn't yet support 'LIMIT & IN/ALL/ANY/SOME subquery.
@@ -235,29 +951,44 @@ Natural language query: "Show me all movies from 1994"
 SQL query: SELECT * FROM movies WHERE release_year = 1994;
 
 Natural language query: "What movies did Tom Hanks star in?"
-SQL query: SELECT m.title, m.release_year FROM movies m JOIN movie_actors ma ON m.id = ma.movie_id JOIN actors a ON ma.actor_id = a.id WHERE a.name = 'Tom Hanks';
-"""
+SQL query: SELECT m.title, m.release_year FROM movies m JOIN movie_actors ma ON m.id = ma.movie_id JOIN actors a ON ma.actor_id = a.id WHERE a.name = 'Tom Hanks';"""
 
-    messages = [
+
+def sql_prompt_messages(query: str, schema: str) -> List[Dict[str, Any]]:
+    """Instructions, examples and schema as system message, then the question."""
+    return [
+        {"role": "system", "content": f"{SQL_SYSTEM_PROMPT}\n\n{schema}"},
         {
             "role": "user",
-            "content": prompt,
-        }
+            "content": f'Natural language query: "{query}"\nSQL query:',
+        },
     ]
 
-    sql_query = await call_llm(messages, llm_config)
+
+async def generate_sql_from_natural_language(
+    query: str, llm_config: Dict[str, str]
+) -> str:
+    """Use Docker Model Runner to convert natural language to SQL."""
+    print(f"DEBUG: Generating SQL from natural language: {query}", file=sys.stderr)
+    schema = await run_in_threadpool(get_database_schema, query)
+    print(f"DEBUG: Database schema: {schema}", file=sys.stderr)
+
+    sql_query = await call_llm(sql_prompt_messages(query, schema), llm_config)
     return sanitize_sql(sql_query)
 
 
-def _format_results_for_summary(results: List[Dict[str, Any]], limit: int) -> str:
+def _format_results_for_summary(
+    results: List[Dict[str, Any]], limit: int, row_count: Optional[int] = None
+) -> str:
     """Prepare a compact JSON string of query results for the LLM."""
     if not results:
         return "No rows returned."
 
+    row_count = len(results) if row_count is None else row_count
     truncated = results[:limit]
-    if len(results) > limit:
+    if row_count > limit:
         truncated.append(
-            {"_note": f"Only first {limit} rows shown out of {len(results)} total."}
+            {"_note": f"Only first {limit} rows shown out of {row_count} total."}
         )
     return json.dumps(truncated, indent=2, default=str)
 
@@ -267,25 +998,28 @@ async def generate_natural_language_answer(
     sql_query: str,
     results: List[Dict[str, Any]],
     llm_config: Dict[str, str],
+    row_count: Optional[int] = None,
 ) -> str:
     """
     Ask the LLM to summarize SQL results in natural language.
+
+    ``results`` may hold only the first rows when ``row_count`` gives the total.
     """
-    row_count = len(results)
-    context = _format_results_for_summary(results, LLM_SUMMARY_ROW_LIMIT)
+    row_count = len(results) if row_count is None else row_count
+    context = _format_results_for_summary(results, LLM_SUMMARY_ROW_LIMIT, row_count)
 
     system_prompt = (
         "You are a helpful data analyst. Provide concise, plain-English answers "
-        "based strictly on the SQL results you receive. Avoid markdown."
+        "based strictly on the SQL results you receive. Avoid markdown.\n"
+        "Explain what the data shows in 2-4 sentences. Mention the row count and "
+        "highlight key values relevant to the question.\n"
+        "If no rows are returned, state that plainly."
     )
     user_prompt = f"""User question: {question}
 SQL query used: {sql_query}
 Row count: {row_count}
 Sample rows:
-{context}
-
-Explain what the data shows in 2-4 sentences. Mention the row count and highlight key values relevant to the question.
-If no rows are returned, state that plainly."""
+{context}"""
 
     return await call_llm(
         [
@@ -297,57 +1031,294 @@ If no rows are returned, state that plainly."""
     )
 
 
-def execute_sql_query(sql_query: str) -> List[Dict[str, Any]]:
-    """Execute SQL query directly."""
-    connection = None
-    try:
-        connection = get_db_connection()
-        with connection.cursor() as cursor:
-            # Security: Only allow SELECT queries
-            sql_upper = sql_query.strip().upper()
-            if not sql_upper.startswith("SELECT"):
-                raise HTTPException(
-                    status_code=400,
-                    detail="Only SELECT queries are allowed for security reasons",
-                )
-
-            cursor.execute(sql_query)
-            results = cursor.fetchall()
+def _run_select(sql_query: str, cursor_class) -> Tuple[Any, Tuple[Any, ...]]:
+    """
+    Execute a SELECT and return the cursor description and all rows.
 
-            # Convert results to list of dicts
-            return [dict(row) for row in results]
+    Runs on a read replica when one is usable. If the chosen replica turns out
+    to be unreachable it is taken out of rotation and the query is retried on
+    the primary.
+    """
+    # Security: Only allow SELECT queries
+    sql_upper = sql_query.strip().upper()
+    if not sql_upper.startswith("SELECT"):
+        raise HTTPException(
+            status_code=400,
+            detail="Only SELECT queries are allowed for security reasons",
+        )
 
+    pool = _acquire_read_pool()
+    try:
+        with pool.connection() as connection:
+            with connection.cursor(cursor_class) as cursor:
+                cursor.execute(sql_query)
+                return cursor.description, cursor.fetchall()
     except HTTPException:
         raise
+    except pymysql.err.OperationalError as e:
+        if not pool.replica or e.args[0] not in CONNECTION_ERRORS:
+            raise HTTPException(
+                status_code=500, detail=f"SQL execution error: {str(e)}"
+            )
+        pool.status.update(healthy=False, error=f"unreachable: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"SQL execution error: {str(e)}")
     finally:
-        if connection:
-            connection.close()
+        _release_read_pool(pool)
+    return _run_select(sql_query, cursor_class)
 
 
-@app.get("/", response_class=HTMLResponse)
-async def read_root():
-    """Serve the main HTML page."""
+def execute_sql_query(sql_query: str) -> List[Dict[str, Any]]:
+    """Execute SQL query directly."""
+    _, results = _run_select(sql_query, pymysql.cursors.DictCursor)
+
+    # Convert results to list of dicts
+    return [dict(row) for row in results]
+
+
+def execute_sql_query_rows(sql_query: str) -> Tuple[List[str], List[Tuple[Any, ...]]]:
+    """
+    Execute SQL query and return column names plus plain row tuples.
+
+    Skips building a dict per row for the columnar, Arrow and CSV formats.
+    """
+    description, rows = _run_select(sql_query, pymysql.cursors.Cursor)
+    return [column[0] for column in description or ()], list(rows)
+
+
+# Result formats for /api/query, negotiated via the Accept header or ?format=
+RESULT_FORMATS = {
+    "application/json": "json",
+    "application/vnd.dmr.columnar+json": "columnar",
+    "application/vnd.apache.arrow.stream": "arrow",
+    "text/csv": "csv",
+}
+RESULT_MEDIA_TYPES = {name: media for media, name in RESULT_FORMATS.items()}
+CSV_CHUNK_ROWS = 1000
+
+
+def negotiate_result_format(request: Request) -> str:
+    """Pick the result format from ?format= or the Accept header."""
+    requested = request.query_params.get("format")
+    if requested is None:
+        # the known media type with the highest q-value, q=0 means "not this"
+        accepted = parse_quality_list(request.headers.get("accept", ""))
+        ranked = sorted(
+            (
+                (quality, RESULT_FORMATS[media_type])
+                for media_type, quality in accepted.items()
+                if media_type in RESULT_FORMATS and quality > 0
+            ),
+            key=lambda item: -item[0],
+        )
+        requested = ranked[0][1] if ranked else "json"
+    if requested not in RESULT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=406,
+            detail=f"Unknown result format '{requested}'. Available formats: {', '.join(RESULT_MEDIA_TYPES)}",
+        )
+    if requested == "arrow" and pa is None:
+        raise HTTPException(
+            status_code=406, detail="Arrow format requires pyarrow on the server"
+        )
+    return requested
+
+
+def _json_default(value: Any) -> Any:
+    """Encode the MariaDB types JSON has no native form for."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps_json(payload: Any) -> bytes:
+    """Serialize with orjson when installed, else the standard library."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_json_default)
+    return json.dumps(payload, default=_json_default, separators=(",", ":")).encode()
+
+
+def format_query_results(
+    result_format: str,
+    query: str,
+    sql_query: str,
+    columns: List[str],
+    rows: List[Tuple[Any, ...]],
+    natural_language_answer: Optional[str],
+    model: Optional[str],
+) -> Response:
+    """Render query results as columnar JSON, an Arrow IPC stream or CSV."""
+    media_type = RESULT_MEDIA_TYPES[result_format]
+    # one list of values per column, the names are sent only once
+    data = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+    metadata = {
+        "natural_language_query": query,
+        "sql_query": sql_query,
+        "natural_language_answer": natural_language_answer,
+        "model": model,
+    }
+
+    if result_format == "columnar":
+        payload = {**metadata, "columns": columns, "row_count": len(rows), "data": data}
+        return Response(dumps_json(payload), media_type=media_type)
+
+    if result_format == "arrow":
+        table = pa.Table.from_arrays(
+            [pa.array(values) for values in data], names=columns
+        ).replace_schema_metadata({key: value or "" for key, value in metadata.items()})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue().to_pybytes(), media_type=media_type)
+
+    def csv_chunks():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for start in range(0, len(rows), CSV_CHUNK_ROWS):
+            writer.writerows(rows[start : start + CSV_CHUNK_ROWS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    # CSV has no place for the metadata, it travels in (URL-encoded) headers
+    headers = {
+        f"X-{key.replace('_', '-').title()}": quote(value)
+        for key, value in metadata.items()
+        if value
+    }
+    headers["X-Row-Count"] = str(len(rows))
+    return StreamingResponse(csv_chunks(), media_type=media_type, headers=headers)
+
+
+@app.on_event("startup")
+async def load_static():
+    load_static_assets()
+
+
+async def replica_monitor() -> None:
+    """Keep replica health and lag current for the lifetime of the service."""
+    while True:
+        await run_in_threadpool(refresh_replica_status)
+        await asyncio.sleep(REPLICA_CHECK_INTERVAL)
+
+
+@app.on_event("startup")
+async def start_replica_monitor():
+    if REPLICA_POOLS:
+        asyncio.create_task(replica_monitor())
+
+
+@app.on_event("startup")
+async def build_schema_index_at_startup():
     try:
-        with open("static/index.html", "r") as f:
-            return f.read()
-    except FileNotFoundError:
-        return """
-        <html>
-            <body>
-                <h1>Natural Language Movie Database Query</h1>
-                <p>Frontend not found. Please ensure static/index.html exists.</p>
-            </body>
-        </html>
-        """
+        await run_in_threadpool(ensure_schema_index)
+    except Exception as e:
+        # built on the first query instead
+        print(f"WARNING: Schema index not built: {e}", file=sys.stderr)
+
+
+async def warm_up_model(llm_config: Dict[str, str]) -> None:
+    """Load a model and prefill the static SQL prompt, retrying until it works.
+
+    The first request after a container start otherwise pays for loading the
+    model into the Model Runner and often runs into LLM_TIMEOUT. Only the
+    instructions and examples are sent: they are the prefix every SQL prompt
+    shares, the schema after them depends on the question.
+    """
+    stats = LLM_STATS[llm_config["model_id"]]
+    client = llm_client(llm_config)
+    while True:
+        stats["warmup"] = "warming"
+        started = time.perf_counter()
+        try:
+            response = await client.chat.completions.create(
+                model=llm_config["model_id"],
+                messages=[{"role": "system", "content": SQL_SYSTEM_PROMPT}],
+                temperature=0.0,
+                max_tokens=1,
+            )
+        except Exception as e:
+            stats.update(warmup="error", warmup_error=str(e))
+            print(
+                f"WARNING: Warm-up of {llm_config['model_id']} failed: {e}",
+                file=sys.stderr,
+            )
+            await asyncio.sleep(LLM_WARMUP_RETRY)
+            continue
+        elapsed = time.perf_counter() - started
+        record_llm_timings(llm_config["model_id"], response, elapsed)
+        stats.update(
+            warmup="ready", warmup_ms=round(elapsed * 1000, 1), warmup_error=None
+        )
+        return
+
+
+async def warm_up_models() -> None:
+    # one after the other, so the models are not loaded into memory at once
+    for llm_config in AVAILABLE_LLM_MODELS.values():
+        await warm_up_model(llm_config)
+
+
+@app.on_event("startup")
+async def start_model_warmup():
+    for llm_config in AVAILABLE_LLM_MODELS.values():
+        llm_client(llm_config)
+    if LLM_WARMUP:
+        asyncio.create_task(warm_up_models())
+
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    while LLM_CLIENTS:
+        _, client = LLM_CLIENTS.popitem()
+        await client.close()
+
+
+@app.api_route("/", methods=["GET", "HEAD"], response_class=HTMLResponse)
+async def read_root(request: Request):
+    """Serve the main HTML page."""
+    return static_response(request, STATIC_ASSETS["/"])
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def read_static(path: str, request: Request):
+    """Serve a static asset from memory."""
+    asset = STATIC_ASSETS.get(f"/static/{path}")
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return static_response(request, asset)
 
 
 @app.post("/api/query", response_model=QueryResponse)
-async def query_database(request: QueryRequest):
+async def query_database(request: QueryRequest, http_request: Request):
     """
     Process a natural language query and return database results.
+
+    The result format is negotiated (see RESULT_FORMATS); errors are always
+    reported as a JSON QueryResponse, an unusable format with status 406.
     """
+    try:
+        result_format = negotiate_result_format(http_request)
+    except HTTPException as e:
+        # same JSON body as every other error, with the 406 status kept
+        return JSONResponse(
+            status_code=e.status_code,
+            content=QueryResponse(
+                natural_language_query=request.query,
+                sql_query="",
+                results=[],
+                model=request.model,
+                error=e.detail,
+            ).model_dump(),
+        )
     try:
         resolved_model, llm_config = get_llm_config(request.model)
 
@@ -357,12 +1328,22 @@ async def query_database(request: QueryRequest):
         )
 
         # Execute SQL query
-        results = execute_sql_query(sql_query)
+        # (blocking driver, so off the event loop to let queries overlap)
+        if result_format == "json":
+            results = await run_in_threadpool(execute_sql_query, sql_query)
+            row_count = len(results)
+        else:
+            columns, rows = await run_in_threadpool(execute_sql_query_rows, sql_query)
+            # only the rows the summary shows are turned into dicts
+            results = [
+                dict(zip(columns, row)) for row in rows[:LLM_SUMMARY_ROW_LIMIT]
+            ]
+            row_count = len(rows)
 
         natural_language_answer: Optional[str] = None
         try:
                 natural_language_answer = await generate_natural_language_answer(
-                    request.query, sql_query, results, llm_config
+                    request.query, sql_query, results, llm_config, row_count
                 )
         except Exception as summary_error:
             print(
@@ -373,6 +1354,17 @@ async def query_database(request: QueryRequest):
                 "Unable to generate a natural language summary at this time."
             )
 
+        if result_format != "json":
+            return format_query_results(
+                result_format,
+                request.query,
+                sql_query,
+                columns,
+                rows,
+                natural_language_answer,
+                resolved_model,
+            )
+
         return QueryResponse(
             natural_language_query=request.query,
             sql_query=sql_query,
@@ -416,9 +1408,45 @@ async def health_check():
         health_status["status"] = "unhealthy"
         health_status["database"] = f"error: {str(e)}"
 
+    health_status["read_pools"] = [
+        pool.snapshot() for pool in [PRIMARY_POOL, *REPLICA_POOLS]
+    ]
+    health_status["models"] = llm_stats_snapshot()
+    health_status["ready"] = health_status["database"] == "connected" and all(
+        stats["warmup"] in ("ready", "disabled") for stats in LLM_STATS.values()
+    )
     return health_status
 
 
+@app.get("/api/health/ready")
+async def readiness():
+    """Readiness probe: 503 until the database answers and the models are warm."""
+    health_status = await health_check()
+    return JSONResponse(
+        health_status, status_code=200 if health_status["ready"] else 503
+    )
+
+
+@app.get("/api/schema")
+async def schema_for_question(query: str = ""):
+    """Show which tables the SQL prompt would include for a question."""
+    try:
+        index = await run_in_threadpool(ensure_schema_index)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Schema unavailable: {e}")
+    selection = select_schema(query, index)
+    return {
+        "query": query,
+        "tables": selection["tables"],
+        "ranking": [
+            {"table": name, "score": score} for score, name in selection["ranking"]
+        ],
+        "estimated_tokens": round(len(selection["text"]) / SCHEMA_CHARS_PER_TOKEN),
+        "total_tables": len(index["tables"]),
+        "schema": selection["text"],
+    }
+
+
 @app.get("/api/models")
 async def list_models():
     """Return the list of available LLM models."""
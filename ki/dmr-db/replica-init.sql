@@ -0,0 +1,3 @@
+-- Runs on mariadb-replica only: the app reads replication lag with
+-- SHOW SLAVE STATUS, which needs this privilege.
+GRANT REPLICA MONITOR ON *.* TO 'user'@'%';
@@ -1,19 +1,159 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, Response, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import httpx
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, BadRequestError
+import asyncio
 import os
-from typing import Optional, List, Dict, Any
+import gzip
+import mimetypes
+import hashlib
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import aclosing
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 import json
 import sys
 import time
 
+try:
+    import brotli
+except ImportError:  # optional, gzip variants are always built
+    brotli = None
+
 app = FastAPI(title="GitLab Chatbot API")
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Static assets are read once at startup and kept in memory together with
+# precompressed gzip/brotli variants. Besides its own name every asset is
+# served under a content-hashed name (style.<hash>.css); index.html links to
+# those, so they can be cached forever while the page itself is revalidated.
+STATIC_DIR = "static"
+STATIC_IMMUTABLE = "public, max-age=31536000, immutable"
+STATIC_REVALIDATE = "no-cache"
+STATIC_ASSETS: Dict[str, Dict[str, Any]] = {}
+
+FALLBACK_HTML = """
+        <html>
+            <body>
+                <h1>GitLab Chatbot</h1>
+                <p>Frontend not found. Please ensure static/index.html exists.</p>
+            </body>
+        </html>
+        """
+
+
+def _static_asset(body: bytes, media_type: str, cache_control: str) -> Dict[str, Any]:
+    """Fingerprint an asset and keep the compressed variants that pay off."""
+    variants = {"identity": body}
+    gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+    if len(gzipped) < len(body):
+        variants["gzip"] = gzipped
+    if brotli is not None:
+        compressed = brotli.compress(body, quality=11)
+        if len(compressed) < len(body):
+            variants["br"] = compressed
+    return {
+        "hash": hashlib.sha256(body).hexdigest()[:16],
+        "media_type": media_type,
+        "cache_control": cache_control,
+        "variants": variants,
+    }
+
+
+def load_static_assets() -> None:
+    """Read, fingerprint and precompress everything below STATIC_DIR."""
+    assets: Dict[str, Dict[str, Any]] = {}
+    hashed_urls: Dict[str, str] = {}
+    for root, _, files in os.walk(STATIC_DIR):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            url = "/static/" + os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+            if url == "/static/index.html":
+                continue
+            with open(path, "rb") as f:
+                body = f.read()
+            media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            asset = _static_asset(body, media_type, STATIC_REVALIDATE)
+            stem, ext = os.path.splitext(url)
+            hashed_urls[url] = f"{stem}.{asset['hash']}{ext}"
+            assets[url] = asset
+            assets[hashed_urls[url]] = {**asset, "cache_control": STATIC_IMMUTABLE}
+
+    try:
+        with open(os.path.join(STATIC_DIR, "index.html"), "r") as f:
+            html = f.read()
+    except FileNotFoundError:
+        html = FALLBACK_HTML
+    for url, hashed_url in hashed_urls.items():
+        html = html.replace(f'"{url}"', f'"{hashed_url}"')
+    assets["/"] = _static_asset(html.encode(), "text/html", STATIC_REVALIDATE)
+    assets["/static/index.html"] = assets["/"]
+
+    STATIC_ASSETS.clear()
+    STATIC_ASSETS.update(assets)
+
+
+def parse_quality_list(value: str) -> Dict[str, float]:
+    """Tokens of an Accept-style header with their q-values (default 1)."""
+    weights: Dict[str, float] = {}
+    for part in value.split(","):
+        token, *params = part.split(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, number = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        weights[token] = quality
+    return weights
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an ETag against an If-None-Match list."""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"') == etag.strip('"'):
+            return True
+    return False
+
+
+def static_response(request: Request, asset: Dict[str, Any]) -> Response:
+    """Serve an in-memory asset, honouring If-None-Match and Accept-Encoding."""
+    accepted = parse_quality_list(request.headers.get("accept-encoding", ""))
+    encoding = next(
+        (
+            name
+            for name in ("br", "gzip")
+            if accepted.get(name, accepted.get("*", 0.0)) > 0
+            and name in asset["variants"]
+        ),
+        "identity",
+    )
+    suffix = "" if encoding == "identity" else f"-{encoding}"
+    headers = {
+        "Cache-Control": asset["cache_control"],
+        "ETag": f'"{asset["hash"]}{suffix}"',
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if suffix:
+        headers["Content-Encoding"] = encoding
+    body = asset["variants"][encoding]
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(len(body))
+        return Response(media_type=asset["media_type"], headers=headers)
+    return Response(body, media_type=asset["media_type"], headers=headers)
+
 
 # Model Runner configuration
 LLM_MODEL = os.getenv("LLM_MODEL")  # set via model runner
@@ -22,6 +162,8 @@ LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.1"))
 LLM_TIMEOUT = float(
     os.getenv("LLM_TIMEOUT", "120.0")
 )  # Default 120 seconds (2 minutes)
+LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() in ("1", "true", "yes")
+LLM_WARMUP_RETRY = float(os.getenv("LLM_WARMUP_RETRY", "10.0"))
 
 GITLAB_PROXY_URL = os.getenv("GITLAB_PROXY_URL", "http://gitlab-proxy:8002").rstrip("/")
 GITLAB_PROXY_TIMEOUT = float(os.getenv("GITLAB_PROXY_TIMEOUT", "30.0"))
@@ -29,16 +171,145 @@ GITLAB_PROXY_TOOLS_TTL = float(os.getenv("GITLAB_PROXY_TOOLS_TTL", "300.0"))
 MAX_TOOL_CALLS = int(os.getenv("GITLAB_MAX_TOOL_CALLS", "3"))
 TOOL_RESULT_SNIPPET_LIMIT = int(os.getenv("GITLAB_TOOL_RESULT_SNIPPET_LIMIT", "1500"))
 DECISION_MAX_RETRIES = int(os.getenv("GITLAB_DECISION_MAX_RETRIES", "2"))
+SESSION_MAX_COUNT = int(os.getenv("GITLAB_SESSION_MAX_COUNT", "200"))
+SESSION_MAX_BYTES = int(os.getenv("GITLAB_SESSION_MAX_BYTES", str(16 * 1024 * 1024)))
+SESSION_RESULT_TTL = float(os.getenv("GITLAB_SESSION_RESULT_TTL", "120.0"))
+SESSION_HISTORY_TURNS = int(os.getenv("GITLAB_SESSION_HISTORY_TURNS", "4"))
+SESSION_ANSWER_CHARS = int(os.getenv("GITLAB_SESSION_ANSWER_CHARS", "300"))
+STREAM_PREVIEW_LIMIT = int(os.getenv("GITLAB_STREAM_PREVIEW_LIMIT", "200"))
+DECISION_STRUCTURED_OUTPUT = os.getenv(
+    "GITLAB_DECISION_STRUCTURED_OUTPUT", "true"
+).lower() in ("1", "true", "yes")
+GITLAB_PROXY_HEALTH_INTERVAL = float(os.getenv("GITLAB_PROXY_HEALTH_INTERVAL", "30.0"))
+GITLAB_PROXY_HEALTH_MAX_AGE = float(os.getenv("GITLAB_PROXY_HEALTH_MAX_AGE", "120.0"))
+SPECULATIVE_PREFETCH = os.getenv("GITLAB_SPECULATIVE_PREFETCH", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+SPECULATIVE_TOP_K = int(os.getenv("GITLAB_SPECULATIVE_TOP_K", "1"))
+# Leave room for the model's reply inside the 4096-token context window.
+PROMPT_TOKEN_BUDGET = int(os.getenv("GITLAB_PROMPT_TOKEN_BUDGET", "3000"))
+CHARS_PER_TOKEN = float(os.getenv("GITLAB_CHARS_PER_TOKEN", "3.5"))
+
+# Fields of each tool result that are worth spending prompt tokens on.
+# Composite tools map each part of their result to the tool it comes from.
+PROMPT_FIELDS: Dict[str, Any] = {
+    "list_open_issues": ("iid", "title", "state", "labels", "assignee", "updated_at"),
+    "issue_detail": (
+        "iid",
+        "title",
+        "state",
+        "description",
+        "labels",
+        "assignees",
+        "updated_at",
+    ),
+    "list_pipelines": ("id", "status", "ref", "created_at"),
+    "pipeline_detail": (
+        "id",
+        "status",
+        "ref",
+        "sha",
+        "source",
+        "created_at",
+        "finished_at",
+        "duration",
+        "web_url",
+    ),
+    "list_branches": ("name", "commit", "message", "default"),
+    "issue_with_pipelines": {"issue": "issue_detail", "pipelines": "list_pipelines"},
+}
 
+# Question keywords hinting at which argument-free tool the model will pick first.
+SPECULATIVE_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "list_open_issues": ("issue", "bug", "ticket", "todo", "task", "open", "work"),
+    "list_pipelines": ("pipeline", "ci", "build", "job", "deploy", "fail", "run"),
+    "list_branches": ("branch", "merge", "ref"),
+}
+
+# Tool catalog plus everything derived from it. A background task keeps it
+# fresh; derived prompt parts are only rebuilt when the catalog hash changes.
 TOOLS_CACHE: Dict[str, Any] = {
     "tools": [],
     "by_name": {},
+    "names": set(),
+    "hash": None,
+    "system_prompt": "",
+    "response_format": None,
     "fetched_at": 0.0,
 }
+TOOLS_REFRESH: Dict[str, Optional[asyncio.Task]] = {"task": None}
+
+# Last known proxy readiness, refreshed in the background so /api/health
+# probes stay local instead of chaining onto the proxy and GitLab.
+PROXY_HEALTH: Dict[str, Any] = {
+    "status": "unknown",
+    "detail": None,
+    "last_check": None,
+    "last_success": None,
+    "latency_ms": None,
+    "upstream": None,
+}
+BACKGROUND_TASKS: List[asyncio.Task] = []
+# One Model Runner client for all calls, so its connection pool is reused
+# instead of every call opening (and leaking) a pool of its own.
+LLM_CLIENT: Dict[str, Optional[AsyncOpenAI]] = {"client": None}
+
+# How often each tool was the model's first pick, and how well speculative
+# prefetching predicted it.
+FIRST_TOOL_COUNTS: Counter = Counter()
+SPECULATION_STATS: Dict[str, int] = {
+    "rounds": 0,
+    "prefetched": 0,
+    "hits": 0,
+    "wasted": 0,
+}
+
+PROMPT_STATS: Dict[str, int] = {
+    "llm_calls": 0,
+    "estimated_prompt_tokens": 0,
+    "reported_prompt_tokens": 0,
+    "summarized_steps": 0,
+}
+# Prompt processing ("prefill") time as reported by llama.cpp in the
+# ``timings`` of each response, and the prompt tokens it took from its cache.
+PREFILL_STATS: Dict[str, Any] = {
+    "reported": 0,
+    "prefill_ms": 0.0,
+    "last_prefill_ms": None,
+    "processed_tokens": 0,
+    "cached_tokens": 0,
+}
+# Startup warm-up: loads the model and prefills the decision system prompt.
+MODEL_WARMUP: Dict[str, Any] = {
+    "status": "pending" if LLM_WARMUP else "disabled",
+    "warmup_ms": None,
+    "detail": None,
+    "catalog_hash": None,
+}
+DECISION_STATS: Dict[str, Any] = {
+    # Switched off at runtime if the Model Runner rejects response_format.
+    "structured_output": DECISION_STRUCTURED_OUTPUT,
+    "decisions": 0,
+    "extracted": 0,
+    "retries": 0,
+    "fallbacks": 0,
+}
+# Conversation sessions in LRU order (most recently used last). Each holds
+# recent tool results keyed by call and a short history of earlier turns.
+SESSIONS: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+SESSION_STATS: Dict[str, int] = {
+    "bytes": 0,
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,
+}
 
 
 class ChatRequest(BaseModel):
     question: str
+    conversation_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
@@ -46,27 +317,52 @@ class ChatResponse(BaseModel):
     answer: str
     action: str
     context: Dict[str, Any]
+    conversation_id: Optional[str] = None
     error: Optional[str] = None
 
 
+def llm_client() -> AsyncOpenAI:
+    """The shared Model Runner client, created on first use."""
+    if LLM_CLIENT["client"] is None:
+        LLM_CLIENT["client"] = AsyncOpenAI(
+            base_url=LLM_URL, timeout=LLM_TIMEOUT, api_key="not_needed"
+        )
+    return LLM_CLIENT["client"]
+
+
 async def call_llm(
     messages: List[Dict[str, Any]],
     temperature: Optional[float] = None,
+    response_format: Optional[Dict[str, Any]] = None,
 ) -> str:
-    """Helper to interact with the Docker Model Runner."""
+    """Helper to interact with the Docker Model Runner.
+
+    ``response_format`` is passed through to constrain the output (JSON schema
+    grammar); servers that do not support it raise ``BadRequestError``.
+    """
     temperature = LLM_TEMPERATURE if temperature is None else temperature
+    PROMPT_STATS["llm_calls"] += 1
+    PROMPT_STATS["estimated_prompt_tokens"] += sum(
+        estimate_tokens(str(message.get("content", ""))) for message in messages
+    )
 
     try:
         print(f"DEBUG: Using LLM_URL: {LLM_URL}", file=sys.stderr)
-        client = AsyncOpenAI(
-            base_url=LLM_URL, timeout=LLM_TIMEOUT, api_key="not_needed"
-        )
+        client = llm_client()
+        extra: Dict[str, Any] = {}
+        if response_format is not None:
+            extra["response_format"] = response_format
         response = await client.chat.completions.create(
             model=LLM_MODEL,
             messages=messages,
             temperature=float(temperature),
+            **extra,
         )
         print(f"DEBUG: LLM response: {response}", file=sys.stderr)
+        usage = getattr(response, "usage", None)
+        if usage is not None and getattr(usage, "prompt_tokens", None):
+            PROMPT_STATS["reported_prompt_tokens"] += usage.prompt_tokens
+        record_prefill(response)
 
         choices = getattr(response, "choices", None) or []
         if choices:
@@ -98,6 +394,69 @@ async def call_llm(
         )
 
 
+def record_prefill(response: Any) -> None:
+    """Add the prefill timings of a response (or final stream chunk)."""
+    timings = (getattr(response, "model_extra", None) or {}).get("timings")
+    if not timings or timings.get("prompt_ms") is None:
+        return
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = timings.get("cache_n") or getattr(details, "cached_tokens", None) or 0
+    PREFILL_STATS["reported"] += 1
+    PREFILL_STATS["prefill_ms"] += timings["prompt_ms"]
+    PREFILL_STATS["last_prefill_ms"] = round(timings["prompt_ms"], 1)
+    PREFILL_STATS["processed_tokens"] += timings.get("prompt_n") or 0
+    PREFILL_STATS["cached_tokens"] += cached
+    print(
+        f"DEBUG: Prefill {timings['prompt_ms']:.1f} ms for "
+        f"{timings.get('prompt_n')} prompt tokens, {cached} from cache",
+        file=sys.stderr,
+    )
+
+
+async def stream_llm(
+    messages: List[Dict[str, Any]],
+    temperature: Optional[float] = None,
+) -> AsyncIterator[str]:
+    """Yield the Model Runner reply token by token.
+
+    Closing the generator (e.g. when the HTTP client disconnects) closes the
+    upstream stream so the model stops generating.
+    """
+    temperature = LLM_TEMPERATURE if temperature is None else temperature
+    PROMPT_STATS["llm_calls"] += 1
+    PROMPT_STATS["estimated_prompt_tokens"] += sum(
+        estimate_tokens(str(message.get("content", ""))) for message in messages
+    )
+
+    client = llm_client()
+    try:
+        stream = await client.chat.completions.create(
+            model=LLM_MODEL,
+            messages=messages,
+            temperature=float(temperature),
+            stream=True,
+        )
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="Model Runner request timeout")
+    except httpx.RequestError as exc:
+        raise HTTPException(
+            status_code=500, detail=f"Model Runner connection error: {str(exc)}"
+        )
+
+    try:
+        async for chunk in stream:
+            record_prefill(chunk)
+            choices = getattr(chunk, "choices", None) or []
+            if not choices:
+                continue
+            text = getattr(choices[0].delta, "content", None)
+            if text:
+                yield text
+    finally:
+        await stream.close()
+
+
 async def call_gitlab_tool(
     name: str, arguments: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
@@ -134,16 +493,8 @@ async def call_gitlab_tool(
         )
 
 
-async def get_available_tools(force_refresh: bool = False) -> List[Dict[str, Any]]:
-    """Retrieve the list of tools exposed by the GitLab proxy."""
-    now = time.time()
-    if (
-        not force_refresh
-        and TOOLS_CACHE["tools"]
-        and now - TOOLS_CACHE["fetched_at"] < GITLAB_PROXY_TOOLS_TTL
-    ):
-        return TOOLS_CACHE["tools"]
-
+async def fetch_tool_catalog() -> None:
+    """Fetch /tools from the proxy and rebuild derived data if it changed."""
     url = f"{GITLAB_PROXY_URL}/tools"
     try:
         async with httpx.AsyncClient(timeout=GITLAB_PROXY_TIMEOUT) as client:
@@ -159,11 +510,6 @@ async def get_available_tools(force_refresh: bool = False) -> List[Dict[str, Any
             raise HTTPException(
                 status_code=500, detail="GitLab proxy /tools returned no tools."
             )
-        TOOLS_CACHE["tools"] = tools
-        TOOLS_CACHE["by_name"] = {tool.get("name"): tool for tool in tools}
-        TOOLS_CACHE["fetched_at"] = now
-        print(f"DEBUG: Fetched {len(tools)} tools from GitLab proxy", file=sys.stderr)
-        return tools
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="GitLab proxy /tools timeout")
     except httpx.RequestError as exc:
@@ -171,6 +517,60 @@ async def get_available_tools(force_refresh: bool = False) -> List[Dict[str, Any
             status_code=500, detail=f"GitLab proxy /tools connection error: {str(exc)}"
         )
 
+    catalog_hash = hashlib.sha256(
+        json.dumps(tools, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    if catalog_hash != TOOLS_CACHE["hash"]:
+        TOOLS_CACHE.update(
+            tools=tools,
+            by_name={tool.get("name"): tool for tool in tools},
+            names={tool.get("name") for tool in tools},
+            hash=catalog_hash,
+            system_prompt=render_decision_system_prompt(tools),
+            response_format=decision_response_format(tools),
+        )
+        print(f"DEBUG: Loaded {len(tools)} tools from GitLab proxy", file=sys.stderr)
+    TOOLS_CACHE["fetched_at"] = time.time()
+
+
+def refresh_tool_catalog() -> asyncio.Task:
+    """Start a catalog refresh, or join the one already in flight."""
+    task = TOOLS_REFRESH["task"]
+    if task is None or task.done():
+        task = asyncio.create_task(fetch_tool_catalog())
+        # Retrieve failures of unawaited background refreshes.
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        TOOLS_REFRESH["task"] = task
+    return task
+
+
+async def get_available_tools(force_refresh: bool = False) -> List[Dict[str, Any]]:
+    """Retrieve the list of tools exposed by the GitLab proxy.
+
+    A cached catalog is always served immediately (stale-while-revalidate);
+    once it is older than GITLAB_PROXY_TOOLS_TTL a single background refresh
+    is started. Only a cold cache or ``force_refresh`` waits for the proxy.
+    """
+    if TOOLS_CACHE["tools"] and not force_refresh:
+        if time.time() - TOOLS_CACHE["fetched_at"] >= GITLAB_PROXY_TOOLS_TTL:
+            refresh_tool_catalog()
+        return TOOLS_CACHE["tools"]
+
+    # Shielded so a cancelled request does not abort the shared refresh.
+    await asyncio.shield(refresh_tool_catalog())
+    return TOOLS_CACHE["tools"]
+
+
+async def tool_catalog_refresher() -> None:
+    """Warm the catalog at startup and keep it fresh off the request path."""
+    while True:
+        try:
+            await asyncio.shield(refresh_tool_catalog())
+        except HTTPException as exc:
+            print(f"DEBUG: Tool catalog refresh failed: {exc.detail}", file=sys.stderr)
+        # Retry quickly until the first catalog has been loaded.
+        await asyncio.sleep(GITLAB_PROXY_TOOLS_TTL if TOOLS_CACHE["tools"] else 5.0)
+
 
 def get_tool_metadata(tool_name: str) -> Dict[str, Any]:
     """Return metadata for a specific tool."""
@@ -201,53 +601,140 @@ def normalize_tool_arguments(
     return normalized
 
 
-def _truncate_result_snippet(data: Any) -> str:
-    """Serialize tool output while keeping prompts compact."""
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate; the Model Runner does not expose its tokenizer."""
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def compact_json(data: Any) -> str:
+    """Serialize without whitespace so no prompt tokens go to indentation."""
     try:
-        serialized = json.dumps(data, indent=2)
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
     except (TypeError, ValueError):
-        serialized = str(data)
-
+        return str(data)
+
+
+def project_tool_result(tool_name: str, data: Any) -> Any:
+    """Reduce a tool result to the fields listed in PROMPT_FIELDS."""
+    fields = PROMPT_FIELDS.get(tool_name)
+    if not fields:
+        return data
+    if isinstance(fields, dict):
+        if not isinstance(data, dict):
+            return data
+        return {
+            key: project_tool_result(fields[key], value) if key in fields else value
+            for key, value in data.items()
+        }
+
+    def pick(item: Any) -> Any:
+        if not isinstance(item, dict):
+            return item
+        return {k: item[k] for k in fields if item.get(k) not in (None, "", [])}
+
+    if isinstance(data, list):
+        return [pick(item) for item in data]
+    if isinstance(data, dict):
+        if any(key in data for key in fields):
+            return pick(data)
+        return {
+            key: [pick(item) for item in value] if isinstance(value, list) else value
+            for key, value in data.items()
+        }
+    return data
+
+
+def _truncate_result_snippet(tool_name: str, data: Any) -> str:
+    """Serialize projected tool output while keeping prompts compact."""
+    serialized = compact_json(project_tool_result(tool_name, data))
     if len(serialized) > TOOL_RESULT_SNIPPET_LIMIT:
         return serialized[:TOOL_RESULT_SNIPPET_LIMIT] + "... (truncated)"
     return serialized
 
 
-def _format_tool_history(steps: List[Dict[str, Any]]) -> str:
-    """Create a readable summary of previous tool invocations."""
+def _summarize_result(data: Any) -> str:
+    """One-line description of a tool result for summarized history steps."""
+    if isinstance(data, list):
+        return f"{len(data)} items"
+    if isinstance(data, dict):
+        parts = [
+            f"{key}: {len(value)} items" if isinstance(value, list) else key
+            for key, value in data.items()
+        ]
+        return ", ".join(parts) or "empty"
+    return type(data).__name__
+
+
+def _format_tool_history(steps: List[Dict[str, Any]], summarized: int = 0) -> str:
+    """Create a compact summary of previous tool invocations.
+
+    The first ``summarized`` steps are reduced to one line each so older
+    context can be dropped when the prompt would exceed its budget.
+    """
     if not steps:
         return "No tools called yet."
 
     history_chunks = []
     for idx, step in enumerate(steps, start=1):
-        arguments = step.get("arguments") or {}
+        tool_name = step.get("tool")
+        arguments = compact_json(step.get("arguments") or {})
         result = step.get("result")
-        chunk = (
-            f"Step {idx}: tool={step.get('tool')} args={json.dumps(arguments)}\n"
-            f"Result:\n{_truncate_result_snippet(result)}"
-        )
+        if idx <= summarized:
+            chunk = (
+                f"Step {idx}: tool={tool_name} args={arguments} "
+                f"(summarized: {_summarize_result(result)})"
+            )
+        else:
+            chunk = (
+                f"Step {idx}: tool={tool_name} args={arguments}\n"
+                f"Result: {_truncate_result_snippet(tool_name, result)}"
+            )
         history_chunks.append(chunk)
-    return "\n\n".join(history_chunks)
+    return "\n".join(history_chunks)
+
+
+def build_budgeted_prompt(
+    system_prompt: str, steps: List[Dict[str, Any]], render_user
+) -> List[Dict[str, Any]]:
+    """Render messages, summarizing the oldest steps until the budget fits.
+
+    ``render_user`` receives the history text and returns the user message.
+    The most recent step is always kept in full.
+    """
+    system_tokens = estimate_tokens(system_prompt)
+    summarized = 0
+    while True:
+        user_prompt = render_user(_format_tool_history(steps, summarized))
+        total = system_tokens + estimate_tokens(user_prompt)
+        if total <= PROMPT_TOKEN_BUDGET or summarized >= len(steps) - 1:
+            break
+        summarized += 1
 
+    PROMPT_STATS["summarized_steps"] += max(0, summarized)
+    if total > PROMPT_TOKEN_BUDGET:
+        print(
+            f"DEBUG: Prompt estimate {total} tokens exceeds budget {PROMPT_TOKEN_BUDGET}",
+            file=sys.stderr,
+        )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
 
-async def decide_next_action(
-    question: str, steps: List[Dict[str, Any]]
-) -> Dict[str, Any]:
-    """Ask the LLM whether to call another tool or produce the final answer."""
-    tools = await get_available_tools()
+
+def render_decision_system_prompt(tools: List[Dict[str, Any]]) -> str:
+    """Render the static orchestration prompt for a tool catalog."""
     tool_descriptions = "\n".join(
         f"- {tool.get('name')}: {tool.get('description', 'No description provided.')}"
         for tool in tools
     )
     schema_details = "\n".join(
-        f"{tool.get('name')}: schema {json.dumps(tool.get('inputSchema', {}), indent=2)}"
+        f"{tool.get('name')}: {compact_json(tool.get('inputSchema', {}))}"
         for tool in tools
     )
-    remaining_calls = max(0, MAX_TOOL_CALLS - len(steps))
     default_tool = tools[0].get("name")
-    history_text = _format_tool_history(steps)
 
-    instruction = f"""You orchestrate GitLab helper tools to answer questions.
+    prompt = f"""You orchestrate GitLab helper tools to answer questions.
 Available tools:
 {tool_descriptions}
 
@@ -255,52 +742,200 @@ Schemas:
 {schema_details}
 
 Respond ONLY with JSON using one of these forms:
-{{"action": "tool", "tool": "<name>", "arguments": {{...}} }}
+{{"action": "tools", "calls": [{{"tool": "<name>", "arguments": {{...}} }}, ...] }}
 {{"action": "final", "answer": "<final response>" }}
 
 Rules:
 - Call at most {MAX_TOOL_CALLS} tools in total.
+- Use "tools" with a single call, or with several independent calls at once
+  when none of them needs another one's output; they run in parallel.
 - Only reference tool names exactly as listed.
 - Arguments must respect each tool schema and omit unknown keys.
 - Use earlier tool outputs to decide whether more context is needed.
 - When you already have enough information, respond with action "final".
 - If unsure which tool to pick, default to {default_tool}.
+
+Each request gives the user question, the previous tool calls and the number
+of tool calls left. Decide whether another tool is required or if you can
+provide the final answer now.
 """
+    return prompt
+
+
+def _call_key(tool_name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+    """Hashable identity of a tool invocation."""
+    return tool_name, json.dumps(arguments, sort_keys=True)
+
+
+def _normalize_tool_calls(
+    parsed: Dict[str, Any], tool_names: set, default_tool: str, limit: int
+) -> List[Dict[str, Any]]:
+    """Turn a single or multi-tool decision into a deduplicated call list."""
+    if parsed.get("action") == "tools" and isinstance(parsed.get("calls"), list):
+        raw_calls = [call for call in parsed["calls"] if isinstance(call, dict)]
+    else:
+        raw_calls = [parsed]
+
+    calls: List[Dict[str, Any]] = []
+    seen = set()
+    for raw in raw_calls:
+        tool_name = raw.get("tool")
+        if tool_name not in tool_names:
+            tool_name = default_tool
+        arguments = raw.get("arguments")
+        if not isinstance(arguments, dict):
+            arguments = {}
+        arguments = normalize_tool_arguments(tool_name, arguments)
+        key = _call_key(tool_name, arguments)
+        if key in seen:
+            continue
+        seen.add(key)
+        calls.append({"tool": tool_name, "arguments": arguments})
+        if len(calls) >= limit:
+            break
+
+    return calls or [{"tool": default_tool, "arguments": {}}]
+
+
+def decision_response_format(tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """JSON schema that constrains the model to one of the decision forms."""
+    tool_names = [tool.get("name") for tool in tools]
+    call_schema = {
+        "type": "object",
+        "properties": {
+            "tool": {"type": "string", "enum": tool_names},
+            "arguments": {"type": "object"},
+        },
+        "required": ["tool", "arguments"],
+    }
+    schema = {
+        "anyOf": [
+            {
+                "type": "object",
+                "properties": {
+                    "action": {"const": "tools"},
+                    "calls": {"type": "array", "items": call_schema, "minItems": 1},
+                },
+                "required": ["action", "calls"],
+            },
+            {
+                "type": "object",
+                "properties": {
+                    "action": {"const": "final"},
+                    "answer": {"type": "string"},
+                },
+                "required": ["action", "answer"],
+            },
+        ]
+    }
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "gitlab_decision", "schema": schema},
+    }
+
+
+def _rejects_response_format(exc: BadRequestError) -> bool:
+    """Whether a 400 from the Model Runner is about the response_format field."""
+    text = f"{exc.message} {exc.body}".lower()
+    return any(word in text for word in ("response_format", "json_schema", "grammar"))
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def extract_json_object(text: Optional[str]) -> Dict[str, Any]:
+    """Return the first JSON object embedded in ``text``.
+
+    Models without constrained decoding often wrap the object in prose,
+    code fences or reasoning output, so every ``{`` is tried as a start.
+    """
+    if not text:
+        return {}
+    try:
+        parsed = json.loads(text)
+        if isinstance(parsed, dict):
+            return parsed
+    except json.JSONDecodeError:
+        pass
+
+    start = text.find("{")
+    while start != -1:
+        try:
+            parsed, _ = _JSON_DECODER.raw_decode(text, start)
+        except json.JSONDecodeError:
+            parsed = None
+        if isinstance(parsed, dict):
+            DECISION_STATS["extracted"] += 1
+            return parsed
+        start = text.find("{", start + 1)
+    return {}
 
-    user_prompt_template = f"""User question: {question}
+
+async def decide_next_action(
+    question: str, steps: List[Dict[str, Any]], conversation: str = ""
+) -> Dict[str, Any]:
+    """Ask the LLM whether to call another tool or produce the final answer."""
+    tools = await get_available_tools()
+    remaining_calls = max(0, MAX_TOOL_CALLS - len(steps))
+    default_tool = tools[0].get("name")
+    earlier = (
+        f"Earlier in this conversation:\n{conversation}\n\n" if conversation else ""
+    )
+
+    # Static instructions live in the system prompt. Everything here grows
+    # at the end from round to round, so each round reuses the prefill of
+    # the one before.
+    def render_user(history_text: str) -> str:
+        return f"""{earlier}User question: {question}
 
 Previous tool calls:
 {history_text}
 
-Remaining tool calls allowed: {remaining_calls}
-
-Decide whether another tool is required or if you can provide the final answer now."""
+Remaining tool calls allowed: {remaining_calls}"""
 
-    messages = [
-        {"role": "system", "content": instruction},
-        {"role": "user", "content": user_prompt_template},
-    ]
+    messages = build_budgeted_prompt(TOOLS_CACHE["system_prompt"], steps, render_user)
 
     attempts = max(1, DECISION_MAX_RETRIES + 1)
-    tool_names = {tool.get("name") for tool in tools}
+    tool_names = TOOLS_CACHE["names"]
 
+    DECISION_STATS["decisions"] += 1
     for attempt in range(attempts):
-        plan_raw = await call_llm(messages, temperature=0.0)
+        if attempt:
+            DECISION_STATS["retries"] += 1
+        response_format = (
+            TOOLS_CACHE["response_format"]
+            if DECISION_STATS["structured_output"]
+            else None
+        )
         try:
-            parsed = json.loads(plan_raw)
-        except json.JSONDecodeError:
-            parsed = {}
+            plan_raw = await call_llm(
+                messages, temperature=0.0, response_format=response_format
+            )
+        except BadRequestError as exc:
+            if response_format is None:
+                raise
+            if _rejects_response_format(exc):
+                print(
+                    f"DEBUG: Structured output unsupported, falling back: {exc}",
+                    file=sys.stderr,
+                )
+                DECISION_STATS["structured_output"] = False
+            else:
+                # some other rejection (e.g. context length): keep structured
+                # output for later decisions, retry this one without it
+                print(
+                    f"DEBUG: Decision request rejected, retrying without schema: {exc}",
+                    file=sys.stderr,
+                )
+            plan_raw = await call_llm(messages, temperature=0.0)
+        parsed = extract_json_object(plan_raw)
 
         action = parsed.get("action")
-        if action == "tool":
-            tool_name = parsed.get("tool")
-            if tool_name not in tool_names:
-                tool_name = default_tool
-            arguments = parsed.get("arguments")
-            if not isinstance(arguments, dict):
-                arguments = {}
-            arguments = normalize_tool_arguments(tool_name, arguments)
-            return {"action": "tool", "tool": tool_name, "arguments": arguments}
+        if action in ("tool", "tools"):
+            calls = _normalize_tool_calls(
+                parsed, tool_names, default_tool, max(1, remaining_calls)
+            )
+            return {"action": "tools", "calls": calls}
         elif action == "final":
             answer = parsed.get("answer")
             if isinstance(answer, str) and answer.strip():
@@ -320,105 +955,380 @@ Decide whether another tool is required or if you can provide the final answer n
             )
 
     # Fallback: request default tool to continue gathering context.
-    return {"action": "tool", "tool": default_tool, "arguments": {}}
+    DECISION_STATS["fallbacks"] += 1
+    return {"action": "tools", "calls": [{"tool": default_tool, "arguments": {}}]}
 
 
-async def synthesize_gitlab_answer(
-    question: str, tool_name: str, context: Dict[str, Any]
-) -> str:
-    """Generate a conversational answer using GitLab context."""
-    context_text = (
-        json.dumps(context, indent=2) if context else "No structured data returned."
+def _synthesis_messages(
+    question: str, tool_name: str, context: Dict[str, Any], conversation: str = ""
+) -> List[Dict[str, Any]]:
+    """Build the budgeted prompt for the final answer."""
+    steps = context.get("steps") or []
+    earlier = (
+        f"Earlier in this conversation:\n{conversation}\n\n" if conversation else ""
     )
     system_prompt = (
         "You are a helpful assistant summarizing GitLab project information. "
         "Use only the provided context; do not fabricate data."
     )
-    user_prompt = f"""User question: {question}
+
+    def render_user(history_text: str) -> str:
+        context_text = history_text if steps else "No structured data returned."
+        return f"""{earlier}User question: {question}
 Selected tool: {tool_name}
 Context:
 {context_text}
 
 Provide a concise answer that references relevant identifiers (issue IID, pipeline ID, branch)."""
 
-    response = await call_llm(
-        [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        temperature=0.2,
-    )
+    return build_budgeted_prompt(system_prompt, steps, render_user)
+
+
+async def synthesize_gitlab_answer(
+    question: str, tool_name: str, context: Dict[str, Any], conversation: str = ""
+) -> str:
+    """Generate a conversational answer using GitLab context."""
+    messages = _synthesis_messages(question, tool_name, context, conversation)
+    response = await call_llm(messages, temperature=0.2)
     return response.strip()
 
 
-async def answer_gitlab_question(question: str) -> Dict[str, Any]:
-    """Full workflow: support multi-step tool calls before answering."""
-    steps: List[Dict[str, Any]] = []
-    final_answer: Optional[str] = None
+def get_session(conversation_id: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+    """Return (id, session), creating one for unknown or missing IDs."""
+    if conversation_id and conversation_id in SESSIONS:
+        SESSIONS.move_to_end(conversation_id)
+        return conversation_id, SESSIONS[conversation_id]
 
-    for _ in range(MAX_TOOL_CALLS):
-        decision = await decide_next_action(question, steps)
-        if decision.get("action") == "tool":
-            tool_name = decision.get("tool")
-            arguments = decision.get("arguments", {})
-            result = await call_gitlab_tool(tool_name, arguments)
-            steps.append(
-                {
-                    "tool": tool_name,
-                    "arguments": arguments,
-                    "result": result,
-                }
-            )
-            continue
+    conversation_id = conversation_id or uuid.uuid4().hex
+    session = {"id": conversation_id, "results": {}, "history": [], "bytes": 0}
+    SESSIONS[conversation_id] = session
+    _evict_sessions(conversation_id)
+    return conversation_id, session
 
-        if decision.get("action") == "final":
-            final_answer = decision.get("answer")
+
+def _evict_sessions(active: str) -> None:
+    """Drop least recently used sessions until count and memory caps hold.
+
+    The session of the conversation being answered is never dropped, even
+    when it alone is over the memory cap.
+    """
+    while (
+        len(SESSIONS) > SESSION_MAX_COUNT or SESSION_STATS["bytes"] > SESSION_MAX_BYTES
+    ):
+        victim = next((key for key in SESSIONS if key != active), None)
+        if victim is None:
             break
+        session = SESSIONS.pop(victim)
+        SESSION_STATS["bytes"] -= session["bytes"]
+        SESSION_STATS["evictions"] += 1
+
+
+def _session_resize(session: Dict[str, Any], delta: int) -> None:
+    """Account a change in a session's size, then enforce the caps."""
+    session["bytes"] += delta
+    # a session evicted while its request was still running is no longer
+    # part of the total
+    if SESSIONS.get(session["id"]) is session:
+        SESSION_STATS["bytes"] += delta
+        _evict_sessions(session["id"])
+
+
+def session_cached_result(session: Dict[str, Any], key: Tuple[str, str]) -> Any:
+    """Return a still-fresh tool result from the session, or None."""
+    entry = session["results"].get(key)
+    if entry and time.time() - entry["fetched_at"] <= SESSION_RESULT_TTL:
+        SESSION_STATS["hits"] += 1
+        return entry["result"]
+    SESSION_STATS["misses"] += 1
+    return None
+
+
+def session_store_result(
+    session: Dict[str, Any], key: Tuple[str, str], result: Any
+) -> None:
+    """Remember a tool result, pruning expired entries and accounting memory."""
+    now = time.time()
+    results = session["results"]
+    delta = 0
+    for stale_key in [
+        k
+        for k, entry in results.items()
+        if now - entry["fetched_at"] > SESSION_RESULT_TTL
+    ]:
+        delta -= results.pop(stale_key)["bytes"]
+    previous = results.pop(key, None)
+    if previous:
+        delta -= previous["bytes"]
+
+    size = len(compact_json(result))
+    results[key] = {"result": result, "fetched_at": now, "bytes": size}
+    _session_resize(session, delta + size)
+
+
+def session_record_turn(
+    session: Dict[str, Any], question: str, answer: str, action: str
+) -> None:
+    """Append a compressed turn and keep only the most recent ones."""
+    if SESSION_HISTORY_TURNS <= 0:
+        # history disabled: history[:-0] would keep everything instead
+        return
+    if len(answer) > SESSION_ANSWER_CHARS:
+        answer = answer[:SESSION_ANSWER_CHARS] + "..."
+    history = session["history"]
+    size = len(question) + len(answer) + len(action)
+    history.append(
+        {"question": question, "answer": answer, "action": action, "bytes": size}
+    )
+    dropped = history[:-SESSION_HISTORY_TURNS]
+    del history[:-SESSION_HISTORY_TURNS]
+    _session_resize(session, size - sum(turn["bytes"] for turn in dropped))
+
+
+def format_conversation(session: Dict[str, Any]) -> str:
+    """Render earlier turns for the prompt so follow-ups keep their context."""
+    return "\n".join(
+        f"Q: {turn['question']}\nTools: {turn['action']}\nA: {turn['answer']}"
+        for turn in session["history"]
+    )
+
+
+def predict_first_tools(question: str, limit: int) -> List[str]:
+    """Guess the model's first tool pick from keywords and past first picks."""
+    candidates = []
+    for tool in TOOLS_CACHE["tools"]:
+        name = tool.get("name")
+        schema = tool.get("inputSchema") or {}
+        if name and not schema.get("required"):
+            candidates.append(name)
+
+    lowered = question.lower()
+    total_picks = sum(FIRST_TOOL_COUNTS.values()) or 1
 
-    action_chain = " -> ".join(step["tool"] for step in steps)
+    def score(name: str) -> float:
+        keyword_hits = sum(
+            word in lowered for word in SPECULATIVE_KEYWORDS.get(name, ())
+        )
+        return keyword_hits + FIRST_TOOL_COUNTS[name] / total_picks
+
+    ranked = sorted(candidates, key=score, reverse=True)
+    return [name for name in ranked if score(name) > 0][:limit]
+
+
+def start_speculative_prefetch(
+    question: str, session: Dict[str, Any]
+) -> Dict[Tuple[str, str], asyncio.Task]:
+    """Start fetching likely first tools while the model is still deciding."""
+    if not SPECULATIVE_PREFETCH or SPECULATIVE_TOP_K <= 0:
+        return {}
+    now = time.time()
+    prefetched = {
+        _call_key(name, {}): asyncio.create_task(call_gitlab_tool(name, {}))
+        for name in predict_first_tools(question, SPECULATIVE_TOP_K)
+        if now - session["results"].get(_call_key(name, {}), {}).get("fetched_at", 0.0)
+        > SESSION_RESULT_TTL
+    }
+    SPECULATION_STATS["rounds"] += 1
+    SPECULATION_STATS["prefetched"] += len(prefetched)
+    return prefetched
+
+
+def _discard_task(task: asyncio.Task) -> None:
+    """Cancel an unused prefetch without leaking 'exception never retrieved'."""
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+def _format_action_chain(steps: List[Dict[str, Any]]) -> str:
+    """Render tool steps as 'a + b -> c', grouping calls that ran in parallel."""
+    rounds: List[List[str]] = []
+    last_round = None
+    for step in steps:
+        if step.get("round") != last_round or not rounds:
+            rounds.append([])
+            last_round = step.get("round")
+        rounds[-1].append(step["tool"])
+    return " -> ".join(" + ".join(tools) for tools in rounds)
+
+
+def result_preview(tool_name: str, data: Any) -> str:
+    """Short compact rendering of a tool result for streamed step events."""
+    serialized = compact_json(project_tool_result(tool_name, data))
+    if len(serialized) > STREAM_PREVIEW_LIMIT:
+        return serialized[:STREAM_PREVIEW_LIMIT] + "..."
+    return serialized
+
+
+async def iter_gitlab_answer(
+    question: str,
+    stream_answer: bool = False,
+    conversation_id: Optional[str] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Run the tool workflow, yielding an event as each stage completes.
+
+    Events are ``tool`` (decision with arguments), ``result`` (compact preview
+    per finished call), ``token`` (answer text, only with ``stream_answer``)
+    and finally ``done`` carrying the same payload as ``/api/chat``. Closing
+    the generator cancels in-flight proxy and LLM calls. Fresh tool results
+    from earlier turns of the same conversation are reused without calling
+    the proxy.
+    """
+    steps: List[Dict[str, Any]] = []
+    final_answer: Optional[str] = None
+    round_number = 0
+    conversation_id, session = get_session(conversation_id)
+    conversation = format_conversation(session)
+
+    await get_available_tools()
+    prefetched = start_speculative_prefetch(question, session)
+
+    try:
+        # Every round adds at least one step, so this also bounds the LLM calls.
+        while len(steps) < MAX_TOOL_CALLS:
+            decision = await decide_next_action(question, steps, conversation)
+            if decision.get("action") == "tools":
+                round_number += 1
+                calls = decision["calls"][: MAX_TOOL_CALLS - len(steps)]
+                if round_number == 1:
+                    FIRST_TOOL_COUNTS.update(call["tool"] for call in calls)
+                tasks: Dict[asyncio.Future, int] = {}
+                for index, call in enumerate(calls):
+                    yield {"type": "tool", "round": round_number, **call}
+                    key = _call_key(call["tool"], call["arguments"])
+                    cached = session_cached_result(session, key)
+                    task = prefetched.pop(key, None)
+                    if cached is not None:
+                        if task is not None:
+                            _discard_task(task)
+                        task = asyncio.get_running_loop().create_future()
+                        task.set_result(cached)
+                    elif task is not None:
+                        SPECULATION_STATS["hits"] += 1
+                    else:
+                        task = asyncio.ensure_future(
+                            call_gitlab_tool(call["tool"], call["arguments"])
+                        )
+                    tasks[task] = index
+                for task in prefetched.values():
+                    SPECULATION_STATS["wasted"] += 1
+                    _discard_task(task)
+                prefetched = {}
+
+                results: List[Any] = [None] * len(calls)
+                pending = set(tasks)
+                try:
+                    while pending:
+                        done, pending = await asyncio.wait(
+                            pending, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        for task in done:
+                            index = tasks[task]
+                            results[index] = task.result()
+                            yield {
+                                "type": "result",
+                                "round": round_number,
+                                "tool": calls[index]["tool"],
+                                "preview": result_preview(
+                                    calls[index]["tool"], results[index]
+                                ),
+                            }
+                finally:
+                    for task in pending:
+                        _discard_task(task)
+
+                for call, result in zip(calls, results):
+                    session_store_result(
+                        session, _call_key(call["tool"], call["arguments"]), result
+                    )
+                    steps.append(
+                        {
+                            "tool": call["tool"],
+                            "arguments": call["arguments"],
+                            "result": result,
+                            "round": round_number,
+                        }
+                    )
+                continue
+
+            if decision.get("action") == "final":
+                final_answer = decision.get("answer")
+                break
+    finally:
+        for task in prefetched.values():
+            SPECULATION_STATS["wasted"] += 1
+            _discard_task(task)
+
+    action_chain = _format_action_chain(steps)
     if not action_chain:
         action_chain = "final" if final_answer else "none"
     context = {"steps": steps}
 
-    if not final_answer:
+    if final_answer:
+        if stream_answer:
+            yield {"type": "token", "text": final_answer}
+    else:
         last_tool = steps[-1]["tool"] if steps else "none"
-        final_answer = await synthesize_gitlab_answer(question, last_tool, context)
+        if stream_answer:
+            messages = _synthesis_messages(question, last_tool, context, conversation)
+            parts: List[str] = []
+            # closed explicitly: if our own consumer goes away mid-answer, the
+            # upstream stream is released now rather than by garbage collection
+            async with aclosing(stream_llm(messages, temperature=0.2)) as tokens:
+                async for text in tokens:
+                    parts.append(text)
+                    yield {"type": "token", "text": text}
+            final_answer = "".join(parts).strip()
+        else:
+            final_answer = await synthesize_gitlab_answer(
+                question, last_tool, context, conversation
+            )
 
-    return {
+    session_record_turn(session, question, final_answer, action_chain)
+    yield {
+        "type": "done",
         "question": question,
         "answer": final_answer,
         "action": action_chain,
         "context": context,
+        "conversation_id": conversation_id,
     }
 
 
-@app.get("/", response_class=HTMLResponse)
-async def read_root():
+async def answer_gitlab_question(
+    question: str, conversation_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Full workflow: support multi-step tool calls before answering."""
+    async for event in iter_gitlab_answer(question, conversation_id=conversation_id):
+        if event["type"] == "done":
+            return {key: value for key, value in event.items() if key != "type"}
+    raise HTTPException(status_code=500, detail="Workflow ended without an answer")
+
+
+@app.api_route("/", methods=["GET", "HEAD"], response_class=HTMLResponse)
+async def read_root(request: Request):
     """Serve the main HTML page."""
-    try:
-        with open("static/index.html", "r") as f:
-            return f.read()
-    except FileNotFoundError:
-        return """
-        <html>
-            <body>
-                <h1>GitLab Chatbot</h1>
-                <p>Frontend not found. Please ensure static/index.html exists.</p>
-            </body>
-        </html>
-        """
+    return static_response(request, STATIC_ASSETS["/"])
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def read_static(path: str, request: Request):
+    """Serve a static asset from memory."""
+    asset = STATIC_ASSETS.get(f"/static/{path}")
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return static_response(request, asset)
 
 
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_gitlab(request: ChatRequest):
     """Answer GitLab-focused questions using the GitLab proxy + LLM combo."""
     try:
-        result = await answer_gitlab_question(request.question)
+        result = await answer_gitlab_question(request.question, request.conversation_id)
         return ChatResponse(
             question=result["question"],
             answer=result["answer"],
             action=result["action"],
             context=result["context"],
+            conversation_id=result["conversation_id"],
             error=None,
         )
     except HTTPException as exc:
@@ -427,6 +1337,7 @@ async def chat_gitlab(request: ChatRequest):
             answer="",
             action="error",
             context={},
+            conversation_id=request.conversation_id,
             error=str(exc.detail),
         )
     except Exception as exc:
@@ -435,29 +1346,222 @@ async def chat_gitlab(request: ChatRequest):
             answer="",
             action="error",
             context={},
+            conversation_id=request.conversation_id,
             error=f"Unexpected error: {str(exc)}",
         )
 
 
-@app.get("/api/health")
-async def health_check():
-    """Health check endpoint."""
-    health_status = {"status": "healthy", "gitlab_proxy": "unknown"}
-
+async def refresh_proxy_health() -> None:
+    """Poll the proxy readiness endpoint once and record the outcome."""
+    checked_at = time.time()
+    started = time.perf_counter()
     try:
-        # Check GitLab proxy connection
         async with httpx.AsyncClient(timeout=GITLAB_PROXY_TIMEOUT) as client:
-            response = await client.get(f"{GITLAB_PROXY_URL}/health")
-            if response.status_code == 200:
-                health_status["gitlab_proxy"] = "connected"
-            else:
-                health_status["status"] = "unhealthy"
-            health_status["gitlab_proxy"] = f"error: HTTP {response.status_code}"
-    except Exception as e:
-        health_status["status"] = "unhealthy"
-        health_status["gitlab_proxy"] = f"error: {str(e)}"
+            response = await client.get(f"{GITLAB_PROXY_URL}/health/ready")
+        upstream = response.json()
+        if response.status_code == 200:
+            PROXY_HEALTH.update(
+                status="connected",
+                detail=None,
+                last_success=checked_at,
+                upstream=upstream,
+            )
+        else:
+            PROXY_HEALTH.update(
+                status="not ready",
+                detail=f"HTTP {response.status_code}",
+                upstream=upstream,
+            )
+    except (httpx.HTTPError, ValueError) as exc:
+        PROXY_HEALTH.update(status="error", detail=str(exc), upstream=None)
+    PROXY_HEALTH["last_check"] = checked_at
+    PROXY_HEALTH["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
 
-    return health_status
+async def proxy_health_refresher() -> None:
+    """Keep PROXY_HEALTH current for the lifetime of the app."""
+    while True:
+        await refresh_proxy_health()
+        await asyncio.sleep(GITLAB_PROXY_HEALTH_INTERVAL)
+
+
+async def warm_up_model() -> None:
+    """Load the model and prefill the decision system prompt.
+
+    The first question after a start otherwise waits for the Model Runner to
+    load the model and often runs into LLM_TIMEOUT.
+    """
+    tools = await get_available_tools()
+    messages = [
+        {"role": "system", "content": TOOLS_CACHE["system_prompt"]},
+        {
+            "role": "user",
+            "content": "User question: warm-up\n\n"
+            "Previous tool calls:\nNo tools called yet.",
+        },
+    ]
+    catalog_hash = TOOLS_CACHE["hash"]
+    client = llm_client()
+    started = time.perf_counter()
+    response = await client.chat.completions.create(
+        model=LLM_MODEL, messages=messages, temperature=0.0, max_tokens=1
+    )
+    record_prefill(response)
+    MODEL_WARMUP.update(
+        status="ready",
+        warmup_ms=round((time.perf_counter() - started) * 1000, 1),
+        detail=None,
+        catalog_hash=catalog_hash,
+    )
+    print(
+        f"DEBUG: Warmed up {LLM_MODEL} with {len(tools)} tools "
+        f"in {MODEL_WARMUP['warmup_ms']} ms",
+        file=sys.stderr,
+    )
+
+
+async def model_warmer() -> None:
+    """Warm the model at startup and again when the tool catalog changes.
+
+    A new catalog means a new system prompt, whose prefill is not cached yet.
+    """
+    while True:
+        if (
+            MODEL_WARMUP["status"] != "ready"
+            or MODEL_WARMUP["catalog_hash"] != TOOLS_CACHE["hash"]
+        ):
+            try:
+                await warm_up_model()
+            except Exception as exc:
+                if MODEL_WARMUP["status"] != "ready":
+                    MODEL_WARMUP["status"] = "error"
+                MODEL_WARMUP["detail"] = str(getattr(exc, "detail", exc))
+                print(
+                    f"DEBUG: Model warm-up failed: {MODEL_WARMUP['detail']}",
+                    file=sys.stderr,
+                )
+                await asyncio.sleep(LLM_WARMUP_RETRY)
+                continue
+        await asyncio.sleep(GITLAB_PROXY_TOOLS_TTL)
+
+
+def proxy_health_snapshot() -> Dict[str, Any]:
+    """Return the cached readiness view of the app, its proxy and the model."""
+    last_success = PROXY_HEALTH["last_success"]
+    ready = (
+        last_success is not None
+        and time.time() - last_success <= GITLAB_PROXY_HEALTH_MAX_AGE
+        and MODEL_WARMUP["status"] in ("ready", "disabled")
+    )
+    return {
+        "status": "healthy" if ready else "unhealthy",
+        "ready": ready,
+        "gitlab_proxy": dict(PROXY_HEALTH),
+        "model": {key: MODEL_WARMUP[key] for key in ("status", "warmup_ms", "detail")},
+    }
+
+
+@app.on_event("startup")
+async def load_static():
+    load_static_assets()
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    llm_client()
+    BACKGROUND_TASKS.append(asyncio.create_task(proxy_health_refresher()))
+    BACKGROUND_TASKS.append(asyncio.create_task(tool_catalog_refresher()))
+    if LLM_WARMUP:
+        BACKGROUND_TASKS.append(asyncio.create_task(model_warmer()))
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for task in BACKGROUND_TASKS:
+        task.cancel()
+    client, LLM_CLIENT["client"] = LLM_CLIENT["client"], None
+    if client is not None:
+        await client.close()
+
+
+@app.post("/api/chat/stream")
+async def chat_gitlab_stream(request: ChatRequest):
+    """Stream the workflow as NDJSON: tool/result step events, answer tokens, done.
+
+    If the client disconnects the response generator is cancelled, which
+    aborts the pending proxy and Model Runner requests.
+    """
+
+    async def event_stream() -> AsyncIterator[str]:
+        events = iter_gitlab_answer(
+            request.question,
+            stream_answer=True,
+            conversation_id=request.conversation_id,
+        )
+        try:
+            async for event in events:
+                yield json.dumps(event, default=str) + "\n"
+        except HTTPException as exc:
+            yield json.dumps({"type": "error", "error": str(exc.detail)}) + "\n"
+        except Exception as exc:
+            yield json.dumps(
+                {"type": "error", "error": f"Unexpected error: {str(exc)}"}
+            ) + "\n"
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@app.get("/api/metrics")
+async def metrics():
+    """Orchestration counters for tuning (speculative prefetch hit rate)."""
+    prefetched = SPECULATION_STATS["prefetched"]
+    return {
+        "speculation": {
+            "enabled": SPECULATIVE_PREFETCH,
+            "top_k": SPECULATIVE_TOP_K,
+            **SPECULATION_STATS,
+            "hit_rate": (
+                round(SPECULATION_STATS["hits"] / prefetched, 3) if prefetched else None
+            ),
+        },
+        "first_tool_counts": dict(FIRST_TOOL_COUNTS),
+        "prompt": {
+            "token_budget": PROMPT_TOKEN_BUDGET,
+            **PROMPT_STATS,
+        },
+        "prefill": {
+            **PREFILL_STATS,
+            "prefill_ms": round(PREFILL_STATS["prefill_ms"], 1),
+            "avg_prefill_ms": (
+                round(PREFILL_STATS["prefill_ms"] / PREFILL_STATS["reported"], 1)
+                if PREFILL_STATS["reported"]
+                else None
+            ),
+        },
+        "decision": DECISION_STATS,
+        "sessions": {"count": len(SESSIONS), **SESSION_STATS},
+    }
+
+
+@app.get("/api/health/live")
+async def liveness():
+    """Liveness probe: the app process is up."""
+    return {"status": "alive"}
+
+
+@app.get("/api/health/ready")
+async def readiness():
+    """Readiness probe served from the cached proxy health snapshot."""
+    snapshot = proxy_health_snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+
+@app.get("/api/health")
+async def health_check():
+    """Health check endpoint (cached, never calls the proxy inline)."""
+    return proxy_health_snapshot()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Mock GitLab v4 API
+Serves the demo project's issues, pipelines and branches from fixtures.json
+with configurable latency, so the proxy can be benchmarked without a real
+GitLab instance. The same fixtures are exposed through a subset of GitLab's
+GraphQL schema at /api/graphql. Call counts per endpoint and response bytes
+are available at /_stats.
+"""
+
+import asyncio
+import json
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from graphql import build_schema, graphql
+
+FIXTURES_PATH = Path(
+    os.getenv("MOCK_GITLAB_FIXTURES", Path(__file__).with_name("fixtures.json"))
+)
+LATENCY_MS = float(os.getenv("MOCK_GITLAB_LATENCY_MS", "50"))
+# Synthetic open issues appended to the fixtures to enlarge payloads/pages.
+EXTRA_ISSUES = int(os.getenv("MOCK_GITLAB_EXTRA_ISSUES", "0"))
+
+FIXTURES: Dict[str, Any] = json.loads(FIXTURES_PATH.read_text())
+for n in range(EXTRA_ISSUES):
+    iid = 100 + n
+    FIXTURES["issues"].append(
+        {
+            "id": 10000 + iid,
+            "iid": iid,
+            "title": f"Synthetic backlog item {iid}",
+            "description": "Generated by MOCK_GITLAB_EXTRA_ISSUES. " * 5,
+            "state": "opened",
+            "labels": ["backlog"],
+            "assignee": None,
+            "assignees": [],
+            "web_url": f"{FIXTURES['project']['web_url']}/-/issues/{iid}",
+            "created_at": "2025-10-01T09:00:00Z",
+            "updated_at": "2025-10-01T09:00:00Z",
+        }
+    )
+
+CALLS: Counter = Counter()
+
+app = FastAPI(title="Mock GitLab API")
+
+
+@app.middleware("http")
+async def simulate_latency(request: Request, call_next):
+    """Count upstream calls and response bytes, delay every API response."""
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    CALLS[request.url.path] += 1
+    CALLS["total"] += 1
+    await asyncio.sleep(LATENCY_MS / 1000)
+    response = await call_next(request)
+    # The proxy's health checks are counted separately by the project route.
+    if not getattr(request.state, "health_probe", False):
+        CALLS["bytes"] += int(response.headers.get("content-length", 0))
+    return response
+
+
+def paginate(
+    items: List[Dict[str, Any]], response: Response, page: int, per_page: int
+) -> List[Dict[str, Any]]:
+    """Slice a list the way GitLab does and set its pagination headers."""
+    per_page = max(1, min(per_page, 100))
+    start = (max(page, 1) - 1) * per_page
+    chunk = items[start : start + per_page]
+    total_pages = max(1, -(-len(items) // per_page))
+    response.headers["X-Total"] = str(len(items))
+    response.headers["X-Total-Pages"] = str(total_pages)
+    response.headers["X-Page"] = str(page)
+    response.headers["X-Per-Page"] = str(per_page)
+    response.headers["X-Next-Page"] = str(page + 1) if page < total_pages else ""
+    return chunk
+
+
+def by_updated(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(items, key=lambda item: item.get("updated_at") or "", reverse=True)
+
+
+@app.get("/api/v4/projects/{project_id:path}/issues/{issue_iid}")
+async def issue_detail(project_id: str, issue_iid: int):
+    for issue in FIXTURES["issues"]:
+        if issue["iid"] == issue_iid:
+            return issue
+    raise HTTPException(status_code=404, detail="404 Issue Not Found")
+
+
+@app.get("/api/v4/projects/{project_id:path}/issues")
+async def list_issues(
+    project_id: str,
+    response: Response,
+    state: Optional[str] = None,
+    page: int = 1,
+    per_page: int = 20,
+):
+    issues = [
+        issue for issue in FIXTURES["issues"] if not state or issue["state"] == state
+    ]
+    return paginate(by_updated(issues), response, page, per_page)
+
+
+@app.get("/api/v4/projects/{project_id:path}/pipelines/{pipeline_id}")
+async def pipeline_detail(project_id: str, pipeline_id: int):
+    for pipeline in FIXTURES["pipelines"]:
+        if pipeline["id"] == pipeline_id:
+            return pipeline
+    raise HTTPException(status_code=404, detail="404 Pipeline Not Found")
+
+
+@app.get("/api/v4/projects/{project_id:path}/pipelines")
+async def list_pipelines(
+    project_id: str,
+    response: Response,
+    ref: Optional[str] = None,
+    page: int = 1,
+    per_page: int = 20,
+):
+    pipelines = [
+        pipeline
+        for pipeline in FIXTURES["pipelines"]
+        if not ref or pipeline["ref"] == ref
+    ]
+    return paginate(by_updated(pipelines), response, page, per_page)
+
+
+@app.get("/api/v4/projects/{project_id:path}/repository/branches")
+async def list_branches(
+    project_id: str, response: Response, page: int = 1, per_page: int = 20
+):
+    return paginate(FIXTURES["branches"], response, page, per_page)
+
+
+@app.get("/api/v4/projects/{project_id:path}")
+async def project(project_id: str, request: Request):
+    # Only the proxy's health check asks for the project itself.
+    CALLS["project"] += 1
+    request.state.health_probe = True
+    return FIXTURES["project"]
+
+
+# The part of GitLab's GraphQL schema the proxy queries, same names and types.
+SCHEMA = build_schema("""
+    scalar Time
+    scalar CiPipelineID
+
+    enum IssuableState { opened closed locked all }
+    enum IssueSort { UPDATED_DESC UPDATED_ASC CREATED_DESC CREATED_ASC }
+    enum PipelineStatusEnum {
+      CREATED WAITING_FOR_RESOURCE PREPARING PENDING RUNNING
+      FAILED SUCCESS CANCELED SKIPPED MANUAL SCHEDULED
+    }
+
+    type Query { project(fullPath: ID!): Project }
+
+    type Project {
+      fullPath: ID!
+      webUrl: String
+      issue(iid: String): Issue
+      issues(state: IssuableState, sort: IssueSort, first: Int): IssueConnection
+      pipeline(id: CiPipelineID, iid: ID): Pipeline
+      pipelines(ref: String, first: Int): PipelineConnection
+    }
+
+    type Label { title: String! }
+    type LabelConnection { nodes: [Label] }
+    type UserCore { username: String! name: String }
+    type UserCoreConnection { nodes: [UserCore] }
+
+    type Issue {
+      iid: String!
+      title: String!
+      description: String
+      state: IssuableState!
+      webUrl: String!
+      createdAt: Time!
+      updatedAt: Time!
+      labels: LabelConnection
+      assignees: UserCoreConnection
+    }
+    type IssueConnection { nodes: [Issue] }
+
+    type Pipeline {
+      id: ID!
+      iid: String!
+      status: PipelineStatusEnum!
+      ref: String
+      sha: String
+      source: String
+      path: String
+      createdAt: Time!
+      updatedAt: Time!
+      startedAt: Time
+      finishedAt: Time
+      duration: Int
+      user: UserCore
+    }
+    type PipelineConnection { nodes: [Pipeline] }
+    """)
+
+
+def graphql_issue(issue: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "iid": str(issue["iid"]),
+        "title": issue["title"],
+        "description": issue.get("description"),
+        "state": issue["state"],
+        "webUrl": issue["web_url"],
+        "createdAt": issue["created_at"],
+        "updatedAt": issue["updated_at"],
+        "labels": {"nodes": [{"title": label} for label in issue.get("labels", [])]},
+        "assignees": {"nodes": issue.get("assignees", [])},
+    }
+
+
+def graphql_pipeline(pipeline: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": f"gid://gitlab/Ci::Pipeline/{pipeline['id']}",
+        "iid": str(pipeline["iid"]),
+        "status": pipeline["status"].upper(),
+        "ref": pipeline["ref"],
+        "sha": pipeline["sha"],
+        "source": pipeline.get("source"),
+        "path": urlsplit(pipeline["web_url"]).path,
+        "createdAt": pipeline["created_at"],
+        "updatedAt": pipeline["updated_at"],
+        "startedAt": pipeline.get("started_at"),
+        "finishedAt": pipeline.get("finished_at"),
+        "duration": pipeline.get("duration"),
+        "user": pipeline.get("user"),
+    }
+
+
+def resolve_project(info, fullPath: str) -> Optional[Dict[str, Any]]:
+    """Root resolver; the default resolver calls the nested callables."""
+    if fullPath != FIXTURES["project"]["path_with_namespace"]:
+        return None
+
+    def issue(info, iid: Optional[str] = None):
+        for item in FIXTURES["issues"]:
+            if str(item["iid"]) == iid:
+                return graphql_issue(item)
+        return None
+
+    def issues(info, state=None, sort="CREATED_DESC", first=100):
+        items = [
+            item
+            for item in FIXTURES["issues"]
+            if state in (None, "all") or item["state"] == state
+        ]
+        key = "updated_at" if sort.startswith("UPDATED") else "created_at"
+        items.sort(key=lambda item: item[key], reverse=sort.endswith("DESC"))
+        return {"nodes": [graphql_issue(item) for item in items[:first]]}
+
+    def pipeline(info, id=None, iid=None):
+        for item in FIXTURES["pipelines"]:
+            if id == f"gid://gitlab/Ci::Pipeline/{item['id']}" or iid == str(
+                item["iid"]
+            ):
+                return graphql_pipeline(item)
+        return None
+
+    def pipelines(info, ref=None, first=100):
+        items = [
+            item for item in FIXTURES["pipelines"] if not ref or item["ref"] == ref
+        ]
+        items.sort(key=lambda item: item["id"], reverse=True)
+        return {"nodes": [graphql_pipeline(item) for item in items[:first]]}
+
+    return {
+        "fullPath": fullPath,
+        "webUrl": FIXTURES["project"]["web_url"],
+        "issue": issue,
+        "issues": issues,
+        "pipeline": pipeline,
+        "pipelines": pipelines,
+    }
+
+
+@app.post("/api/graphql")
+async def graphql_endpoint(request: Request):
+    body = await request.json()
+    result = await graphql(
+        SCHEMA,
+        body.get("query", ""),
+        root_value={"project": resolve_project},
+        variable_values=body.get("variables"),
+    )
+    payload: Dict[str, Any] = {"data": result.data}
+    if result.errors:
+        payload["errors"] = [error.formatted for error in result.errors]
+    return payload
+
+
+@app.get("/_stats")
+async def stats():
+    return dict(CALLS)
+
+
+@app.post("/_stats/reset")
+async def reset_stats():
+    CALLS.clear()
+    return {"status": "reset"}
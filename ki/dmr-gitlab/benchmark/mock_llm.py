@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Scripted OpenAI-compatible model
+Answers /v1/chat/completions deterministically so the chatbot's
+orchestration loop can be benchmarked without a real model:
+
+- decision prompts get tool calls picked from question keywords on the
+  first round and a final answer once tool results are present,
+- synthesis prompts get a short canned summary (streamed when requested).
+
+Latency is simulated as a fixed cost plus a per-prompt-character and
+per-output-token cost, so prompt size changes show up in the numbers. Like
+llama.cpp, the mock keeps the last prompts of a few slots and only charges
+prefill for the characters after the longest prefix shared with one of
+them, reports that as ``timings`` and pays a one-off model load on the
+first request.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+BASE_LATENCY_MS = float(os.getenv("MOCK_LLM_LATENCY_MS", "300"))
+PER_PROMPT_CHAR_MS = float(os.getenv("MOCK_LLM_PER_PROMPT_CHAR_MS", "0.02"))
+PER_TOKEN_MS = float(os.getenv("MOCK_LLM_PER_TOKEN_MS", "5"))
+LOAD_MS = float(os.getenv("MOCK_LLM_LOAD_MS", "0"))
+CACHE_SLOTS = int(os.getenv("MOCK_LLM_CACHE_SLOTS", "4"))
+
+# Most recently used prompt last; the least recently used slot is reused.
+SLOTS: List[str] = []
+LOADED = asyncio.Lock()
+
+STATS: Counter = Counter()
+
+app = FastAPI(title="Mock Model Runner")
+
+
+def pick_tools(question: str) -> List[Dict[str, Any]]:
+    """Choose first-round tool calls the way a sensible model would."""
+    lowered = question.lower()
+    calls = []
+    match = re.search(r"#(\d+)", question)
+    if match:
+        calls.append(
+            {"tool": "issue_detail", "arguments": {"issue_iid": int(match.group(1))}}
+        )
+    elif "issue" in lowered:
+        calls.append({"tool": "list_open_issues", "arguments": {}})
+    if "pipeline" in lowered or " ci" in lowered:
+        ref = re.search(r"`([^`]+)`", question)
+        arguments = {"ref": ref.group(1)} if ref else {}
+        calls.append({"tool": "list_pipelines", "arguments": arguments})
+    if "branch" in lowered:
+        calls.append({"tool": "list_branches", "arguments": {}})
+    return calls or [{"tool": "list_open_issues", "arguments": {}}]
+
+
+def scripted_reply(messages: List[Dict[str, Any]]) -> str:
+    system = str(messages[0].get("content", "")) if messages else ""
+    user = str(messages[-1].get("content", "")) if messages else ""
+    question_match = re.search(r"User question: (.*)", user)
+    question = question_match.group(1) if question_match else user
+
+    if system.startswith("You orchestrate"):
+        STATS["decisions"] += 1
+        if "No tools called yet." in user:
+            return json.dumps({"action": "tools", "calls": pick_tools(question)})
+        return json.dumps(
+            {"action": "final", "answer": f"Scripted answer for: {question}"}
+        )
+
+    STATS["syntheses"] += 1
+    return (
+        f"Scripted summary for '{question}': the requested GitLab data was "
+        "retrieved and reviewed; see the context for issue IIDs and pipeline IDs."
+    )
+
+
+def serialize_prompt(messages: List[Dict[str, Any]]) -> str:
+    return "".join(
+        f"<|{message.get('role')}|>{message.get('content', '')}" for message in messages
+    )
+
+
+def take_slot(prompt: str) -> int:
+    """Return how many leading characters of ``prompt`` are already cached."""
+    best, cached = None, 0
+    for index, slot in enumerate(SLOTS):
+        shared = len(os.path.commonprefix([slot, prompt]))
+        if shared > cached:
+            best, cached = index, shared
+    if best is not None:
+        del SLOTS[best]
+    elif len(SLOTS) >= CACHE_SLOTS:
+        del SLOTS[0]
+    if CACHE_SLOTS > 0:
+        SLOTS.append(prompt)
+    return cached
+
+
+async def load_model() -> None:
+    async with LOADED:
+        if not STATS["loaded"]:
+            await asyncio.sleep(LOAD_MS / 1000)
+            STATS["loaded"] = 1
+
+
+@app.post("/v1/chat/completions")
+@app.post("/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in messages)
+    STATS["requests"] += 1
+    STATS["prompt_chars"] += prompt_chars
+
+    await load_model()
+    reply = scripted_reply(messages)
+    tokens = reply.split(" ")
+    if body.get("max_tokens"):
+        tokens = tokens[: body["max_tokens"]]
+        reply = " ".join(tokens)
+    prompt = serialize_prompt(messages)
+    cached_chars = take_slot(prompt)
+    prefill_ms = (len(prompt) - cached_chars) * PER_PROMPT_CHAR_MS
+    STATS["cached_chars"] += cached_chars
+    STATS["prefill_ms"] += round(prefill_ms)
+    await asyncio.sleep((BASE_LATENCY_MS + prefill_ms) / 1000)
+
+    created = int(time.time())
+    usage = {
+        "prompt_tokens": prompt_chars // 4,
+        "completion_tokens": len(tokens),
+        "total_tokens": prompt_chars // 4 + len(tokens),
+    }
+    timings = {
+        "cache_n": cached_chars // 4,
+        "prompt_n": (len(prompt) - cached_chars) // 4,
+        "prompt_ms": prefill_ms,
+        "predicted_n": len(tokens),
+        "predicted_ms": len(tokens) * PER_TOKEN_MS,
+    }
+
+    if not body.get("stream"):
+        await asyncio.sleep(len(tokens) * PER_TOKEN_MS / 1000)
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": created,
+            "model": body.get("model") or "mock",
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": usage,
+            "timings": timings,
+        }
+
+    async def event_stream():
+        for index, token in enumerate(tokens):
+            await asyncio.sleep(PER_TOKEN_MS / 1000)
+            chunk = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model") or "mock",
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"content": token if index == 0 else " " + token},
+                        "finish_reason": None,
+                    }
+                ],
+            }
+            if index == len(tokens) - 1:
+                chunk["choices"][0]["finish_reason"] = "stop"
+                chunk["timings"] = timings
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.get("/_stats")
+async def stats():
+    return dict(STATS)
+
+
+@app.post("/_stats/reset")
+async def reset_stats():
+    loaded = STATS["loaded"]
+    STATS.clear()
+    STATS["loaded"] = loaded
+    return {"status": "reset"}
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark for the GitLab chatbot.
+
+Starts the mock GitLab API, the scripted model, the real gitlab_proxy and the
+real webapp as local processes, then drives concurrent multi-turn chat
+sessions through /api/chat/stream and reports:
+
+- per-stage latency percentiles (first decision, first tool result, first
+  answer token, total),
+- upstream call counts (GitLab API requests, LLM requests) and GitLab
+  response bytes per question,
+- the model's prefill time per request and the share of prompt characters
+  served from its prefix cache,
+- cache effectiveness from the webapp's /api/metrics,
+- questions that failed (error event, HTTP error, timeout), which are left
+  out of the latency figures.
+
+Usage:
+    pip install -r requirements.txt
+    python run_benchmark.py --sessions 8 --gitlab-latency-ms 80 --llm-latency-ms 400
+
+Set BENCH_VERBOSE=1 to see the services' log output.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "app"
+PROXY_DIR = BENCH_DIR.parent / "gitlab-proxy"
+
+# Each entry is one conversation; later questions are follow-ups.
+SCENARIOS: List[List[str]] = [
+    [
+        "What open issues should I take care of today?",
+        "Show me details about issue #1.",
+        "And the pipeline for `feature/lighthouse-gate`?",
+        "Which of those open issues are assigned to someone?",
+    ],
+    [
+        "Summarize the latest pipeline for `feature/lighthouse-gate`.",
+        "Which open issues are related to it?",
+    ],
+    [
+        "List the branches and pipelines involved in the CI hardening work.",
+        "What open issues are still there?",
+    ],
+]
+
+STAGES = ("decision", "first_result", "first_token", "total")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_service(
+    module: str, cwd: Path, port: int, env: Dict[str, str]
+) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            f"{module}:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=cwd,
+        env={**os.environ, **env},
+        stderr=None if os.environ.get("BENCH_VERBOSE") else subprocess.DEVNULL,
+    )
+
+
+async def wait_until_ok(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Service did not become ready: {url}")
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+async def ask(
+    client: httpx.AsyncClient,
+    base_url: str,
+    question: str,
+    conversation_id: Optional[str],
+) -> Dict[str, Any]:
+    """Send one streamed question and time each stage in milliseconds."""
+    timings: Dict[str, float] = {}
+    done: Dict[str, Any] = {}
+    started = time.perf_counter()
+    async with client.stream(
+        "POST",
+        f"{base_url}/api/chat/stream",
+        json={"question": question, "conversation_id": conversation_id},
+    ) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            elapsed = (time.perf_counter() - started) * 1000
+            stage = {
+                "tool": "decision",
+                "result": "first_result",
+                "token": "first_token",
+            }.get(event["type"])
+            if stage and stage not in timings:
+                timings[stage] = elapsed
+            if event["type"] == "done":
+                done = event
+            elif event["type"] == "error":
+                raise RuntimeError(event["error"])
+    if not done:
+        raise RuntimeError("stream ended without an answer")
+    timings["total"] = (time.perf_counter() - started) * 1000
+    return {"timings": timings, "done": done}
+
+
+async def run_session(
+    client: httpx.AsyncClient, base_url: str, questions: List[str]
+) -> List[Dict[str, Any]]:
+    conversation_id = None
+    outcomes = []
+    for question in questions:
+        try:
+            outcome = await ask(client, base_url, question, conversation_id)
+        except (RuntimeError, httpx.HTTPError) as exc:
+            # counted and reported; the conversation goes on with the next one
+            outcomes.append({"error": f"{type(exc).__name__}: {exc}"})
+            continue
+        conversation_id = outcome["done"].get("conversation_id")
+        outcomes.append(outcome)
+    return outcomes
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    gitlab_port, llm_port, proxy_port, app_port = (free_port() for _ in range(4))
+    gitlab_url = f"http://127.0.0.1:{gitlab_port}"
+    llm_url = f"http://127.0.0.1:{llm_port}"
+    proxy_url = f"http://127.0.0.1:{proxy_port}"
+    app_url = f"http://127.0.0.1:{app_port}"
+
+    processes = [
+        start_service(
+            "mock_gitlab",
+            BENCH_DIR,
+            gitlab_port,
+            {
+                "MOCK_GITLAB_LATENCY_MS": str(args.gitlab_latency_ms),
+                "MOCK_GITLAB_EXTRA_ISSUES": str(args.extra_issues),
+            },
+        ),
+        start_service(
+            "mock_llm",
+            BENCH_DIR,
+            llm_port,
+            {
+                "MOCK_LLM_LATENCY_MS": str(args.llm_latency_ms),
+                "MOCK_LLM_LOAD_MS": str(args.llm_load_ms),
+            },
+        ),
+        start_service(
+            "gitlab_proxy",
+            PROXY_DIR,
+            proxy_port,
+            {
+                "GITLAB_API_URL": f"{gitlab_url}/api/v4",
+                "GITLAB_TOKEN": "benchmark-token",
+                "GITLAB_PROJECT_ID": "dockerbuch/webpage",
+                "GITLAB_HEALTH_INTERVAL": "2",
+                "GITLAB_GRAPHQL": "true" if args.graphql else "false",
+            },
+        ),
+        start_service(
+            "main",
+            APP_DIR,
+            app_port,
+            {
+                "LLM_URL": f"{llm_url}/v1",
+                "LLM_MODEL": "mock",
+                "GITLAB_PROXY_URL": proxy_url,
+                "GITLAB_PROXY_HEALTH_INTERVAL": "1",
+                "GITLAB_SPECULATIVE_PREFETCH": "true" if args.speculative else "false",
+                "LLM_WARMUP": "false" if args.no_warmup else "true",
+            },
+        ),
+    ]
+
+    try:
+        await wait_until_ok(f"{gitlab_url}/_stats")
+        await wait_until_ok(f"{llm_url}/_stats")
+        await wait_until_ok(f"{proxy_url}/health/ready")
+        await wait_until_ok(f"{app_url}/api/health/ready")
+        async with httpx.AsyncClient() as client:
+            await client.post(f"{gitlab_url}/_stats/reset")
+            await client.post(f"{llm_url}/_stats/reset")
+
+        limits = httpx.Limits(max_connections=args.sessions * 2)
+        async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+            started = time.perf_counter()
+            sessions = await asyncio.gather(
+                *(
+                    run_session(client, app_url, SCENARIOS[n % len(SCENARIOS)])
+                    for n in range(args.sessions)
+                )
+            )
+            wall_seconds = time.perf_counter() - started
+
+            gitlab_stats = (await client.get(f"{gitlab_url}/_stats")).json()
+            llm_stats = (await client.get(f"{llm_url}/_stats")).json()
+            app_metrics = (await client.get(f"{app_url}/api/metrics")).json()
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    outcomes = [outcome for session in sessions for outcome in session]
+    questions = len(outcomes)
+    failures = Counter(o["error"] for o in outcomes if "error" in o)
+    outcomes = [o for o in outcomes if "error" not in o]
+    latency = {}
+    for stage in STAGES:
+        values = [o["timings"][stage] for o in outcomes if stage in o["timings"]]
+        latency[stage] = {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+        }
+
+    # Subtract the proxy's background health checks from the GitLab requests.
+    gitlab_tool_calls = gitlab_stats.get("total", 0) - gitlab_stats.get("project", 0)
+    return {
+        "config": vars(args),
+        "questions": questions,
+        "failed": sum(failures.values()),
+        "errors": dict(failures),
+        "wall_seconds": round(wall_seconds, 3),
+        "questions_per_second": round(len(outcomes) / wall_seconds, 2),
+        "latency_ms": latency,
+        "upstream": {
+            "gitlab_requests": gitlab_tool_calls,
+            "gitlab_requests_per_question": round(gitlab_tool_calls / questions, 2),
+            "gitlab_bytes_per_question": round(
+                gitlab_stats.get("bytes", 0) / questions
+            ),
+            "llm_requests": llm_stats.get("requests", 0),
+            "llm_requests_per_question": round(
+                llm_stats.get("requests", 0) / questions, 2
+            ),
+            "llm_prompt_chars_per_request": round(
+                llm_stats.get("prompt_chars", 0) / max(1, llm_stats.get("requests", 0))
+            ),
+            "llm_prefill_ms_per_request": round(
+                llm_stats.get("prefill_ms", 0) / max(1, llm_stats.get("requests", 0)),
+                1,
+            ),
+            "llm_prompt_cached_share": round(
+                llm_stats.get("cached_chars", 0)
+                / max(1, llm_stats.get("prompt_chars", 0)),
+                3,
+            ),
+        },
+        "app_metrics": app_metrics,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"{report['questions']} questions in {report['wall_seconds']}s "
+        f"({report['questions_per_second']} q/s)"
+    )
+    if report["failed"]:
+        print(f"{report['failed']} failed, not in the latency figures:")
+        for error, count in report["errors"].items():
+            print(f"  {count} x {error}")
+    print(f"\n{'stage':<14}{'n':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for stage, values in report["latency_ms"].items():
+        cells = [
+            f"{values[key]:>10.1f}" if values[key] is not None else f"{'-':>10}"
+            for key in ("p50", "p90", "p99")
+        ]
+        print(f"{stage:<14}{values['count']:>6}{''.join(cells)}")
+
+    upstream = report["upstream"]
+    print("\nupstream")
+    for key, value in upstream.items():
+        print(f"  {key:<32}{value}")
+
+    metrics = report["app_metrics"]
+    sessions = metrics.get("sessions", {})
+    lookups = sessions.get("hits", 0) + sessions.get("misses", 0)
+    hit_rate = f"{sessions['hits'] / lookups:.2f}" if lookups else "-"
+    print("\ncaches")
+    print(f"  {'session result hit rate':<32}{hit_rate}")
+    speculation = metrics.get("speculation", {})
+    print(f"  {'speculative prefetch hit rate':<32}{speculation.get('hit_rate')}")
+    print(
+        f"  {'prompt steps summarized':<32}{metrics.get('prompt', {}).get('summarized_steps')}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sessions", type=int, default=6, help="concurrent conversations"
+    )
+    parser.add_argument("--gitlab-latency-ms", type=float, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument(
+        "--llm-load-ms", type=float, default=3000, help="one-off model load time"
+    )
+    parser.add_argument(
+        "--no-warmup",
+        action="store_true",
+        help="start the webapp with LLM_WARMUP=false",
+    )
+    parser.add_argument(
+        "--extra-issues", type=int, default=0, help="synthetic issues added to fixtures"
+    )
+    parser.add_argument(
+        "--speculative", action="store_true", help="enable speculative prefetch"
+    )
+    parser.add_argument(
+        "--graphql", action="store_true", help="proxy uses the GraphQL backend"
+    )
+    parser.add_argument("--json", action="store_true", help="print the raw report")
+    args = parser.parse_args()
+
+    report = asyncio.run(benchmark(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
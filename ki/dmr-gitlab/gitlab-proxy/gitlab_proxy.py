@@ -5,24 +5,36 @@ Exposes lightweight GitLab helpers over HTTP so other services can retrieve
 issues, pipelines, and repository metadata without speaking MCP.
 """
 
+import asyncio
 import json
 import os
-from typing import Any, Dict, List, Optional
+import re
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from urllib.parse import quote_plus
 
 import httpx
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import uvicorn
 
-
 GITLAB_API_URL = os.getenv(
     "GITLAB_API_URL", "https://gitlab.dockerbuch.info/api/v4"
 ).rstrip("/")
 GITLAB_TOKEN = os.getenv("GITLAB_TOKEN")
 RAW_PROJECT_ID = os.getenv("GITLAB_PROJECT_ID", "dockerbuch/webpage")
 GITLAB_TIMEOUT = float(os.getenv("GITLAB_TIMEOUT", "20"))
+GITLAB_HEALTH_INTERVAL = float(os.getenv("GITLAB_HEALTH_INTERVAL", "30"))
+GITLAB_HEALTH_MAX_AGE = float(os.getenv("GITLAB_HEALTH_MAX_AGE", "120"))
+# Optional GraphQL backend; REST stays the fallback for every tool.
+GITLAB_GRAPHQL = os.getenv("GITLAB_GRAPHQL", "false").lower() in ("1", "true", "yes")
+GITLAB_GRAPHQL_URL = os.getenv(
+    "GITLAB_GRAPHQL_URL", GITLAB_API_URL.rsplit("/api/v4", 1)[0] + "/api/graphql"
+)
+GITLAB_GRAPHQL_RETRY = float(os.getenv("GITLAB_GRAPHQL_RETRY", "60"))
 
 if not GITLAB_TOKEN:
     raise RuntimeError(
@@ -49,6 +61,27 @@ class ToolCallResponse(BaseModel):
     content: List[Dict[str, str]]
 
 
+# Snapshot of the last upstream check, refreshed in the background so that
+# health probes never trigger a GitLab request themselves.
+HEALTH_STATUS: Dict[str, Any] = {
+    "status": "starting",
+    "project": None,
+    "detail": None,
+    "last_check": None,
+    "last_success": None,
+    "latency_ms": None,
+}
+HEALTH_TASK: Optional[asyncio.Task] = None
+HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+
+GRAPHQL_STATUS: Dict[str, Any] = {
+    "enabled": GITLAB_GRAPHQL,
+    "queries": 0,
+    "fallbacks": 0,
+    "last_error": None,
+    "retry_at": 0.0,
+}
+
 app = FastAPI(title="GitLab Proxy Service")
 
 app.add_middleware(
@@ -60,12 +93,19 @@ app.add_middleware(
 )
 
 
+def gitlab_client() -> httpx.AsyncClient:
+    """Shared client: upstream connections are reused instead of reopened per call."""
+    global HTTP_CLIENT
+    if HTTP_CLIENT is None:
+        HTTP_CLIENT = httpx.AsyncClient(timeout=GITLAB_TIMEOUT)
+    return HTTP_CLIENT
+
+
 async def gitlab_get(path: str, params: Optional[Dict[str, Any]] = None) -> Any:
     """Perform an authenticated GET request against the GitLab API."""
     url = f"{GITLAB_API_URL}{path}"
     headers = {"PRIVATE-TOKEN": GITLAB_TOKEN}
-    async with httpx.AsyncClient(timeout=GITLAB_TIMEOUT) as client:
-        response = await client.get(url, headers=headers, params=params)
+    response = await gitlab_client().get(url, headers=headers, params=params)
     if response.status_code >= 400:
         raise HTTPException(
             status_code=response.status_code,
@@ -123,111 +163,479 @@ async def list_tools():
                 "description": "List recent branches for the repository.",
                 "inputSchema": {"type": "object", "properties": {}, "required": []},
             },
+            {
+                "name": "issue_with_pipelines",
+                "description": (
+                    "Fetch an issue together with the recent pipelines of the "
+                    "branches it mentions (or of ref) in one call."
+                ),
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "issue_iid": {"type": "integer"},
+                        "ref": {"type": "string"},
+                    },
+                    "required": ["issue_iid"],
+                },
+            },
         ]
     }
 
 
-@app.post("/tools/call", response_model=ToolCallResponse)
-async def call_tool(request: ToolCallRequest):
-    """Execute a GitLab helper tool."""
-    name = request.name
-    args = request.arguments or {}
+def require_argument(args: Dict[str, Any], name: str) -> Any:
+    value = args.get(name)
+    if value is None:
+        raise HTTPException(status_code=400, detail=f"{name} argument is required.")
+    return value
 
-    if name == "list_open_issues":
-        issues = await gitlab_get(
-            f"/projects/{PROJECT_ID}/issues",
-            params={"state": "opened", "order_by": "updated_at", "per_page": 20},
-        )
-        payload = [
-            {
-                "iid": issue["iid"],
-                "title": issue["title"],
-                "state": issue["state"],
-                "labels": issue.get("labels", []),
-                "assignee": (issue.get("assignee") or {}).get("username"),
-                "web_url": issue["web_url"],
-                "updated_at": issue["updated_at"],
-            }
-            for issue in issues
-        ]
-        return as_text_payload({"issues": payload})
-
-    if name == "issue_detail":
-        issue_iid = args.get("issue_iid")
-        if issue_iid is None:
-            raise HTTPException(
-                status_code=400, detail="issue_iid argument is required."
-            )
-        issue = await gitlab_get(f"/projects/{PROJECT_ID}/issues/{issue_iid}")
-        payload = {
+
+def mentioned_refs(issue: Dict[str, Any], refs: List[str]) -> List[str]:
+    """Refs named as a whole word in the issue's title or description."""
+    text = f"{issue.get('title') or ''}\n{issue.get('description') or ''}"
+    return [
+        ref
+        for ref in refs
+        if re.search(rf"(?<![\w/.-]){re.escape(ref)}(?![\w/-])", text)
+    ]
+
+
+def related_pipelines(
+    issue: Dict[str, Any], pipelines: List[Dict[str, Any]], ref: Optional[str]
+) -> List[Dict[str, Any]]:
+    """Pipelines of the requested ref, or of the branches the issue mentions."""
+    if ref:
+        return pipelines
+    refs = set(mentioned_refs(issue, sorted({p["ref"] for p in pipelines})))
+    return [pipeline for pipeline in pipelines if pipeline["ref"] in refs]
+
+
+# REST backend: one GitLab v4 request per tool, full objects reduced here.
+
+
+async def rest_open_issues(args: Dict[str, Any]) -> Dict[str, Any]:
+    issues = await gitlab_get(
+        f"/projects/{PROJECT_ID}/issues",
+        params={"state": "opened", "order_by": "updated_at", "per_page": 20},
+    )
+    payload = [
+        {
             "iid": issue["iid"],
             "title": issue["title"],
             "state": issue["state"],
-            "description": issue.get("description"),
             "labels": issue.get("labels", []),
-            "assignees": [
-                assignee.get("username") for assignee in issue.get("assignees", [])
-            ],
+            "assignee": (issue.get("assignee") or {}).get("username"),
             "web_url": issue["web_url"],
             "updated_at": issue["updated_at"],
         }
-        return as_text_payload(payload)
-
-    if name == "list_pipelines":
-        params = {"per_page": 20, "order_by": "updated_at"}
-        if args.get("ref"):
-            params["ref"] = args["ref"]
-        pipelines = await gitlab_get(f"/projects/{PROJECT_ID}/pipelines", params=params)
-        payload = [
-            {
-                "id": pipeline["id"],
-                "status": pipeline["status"],
-                "ref": pipeline["ref"],
-                "sha": pipeline["sha"],
-                "web_url": pipeline["web_url"],
-                "created_at": pipeline["created_at"],
-            }
-            for pipeline in pipelines
-        ]
-        return as_text_payload({"pipelines": payload})
-
-    if name == "pipeline_detail":
-        pipeline_id = args.get("pipeline_id")
-        if pipeline_id is None:
-            raise HTTPException(
-                status_code=400, detail="pipeline_id argument is required."
-            )
-        pipeline = await gitlab_get(f"/projects/{PROJECT_ID}/pipelines/{pipeline_id}")
-        return as_text_payload(pipeline)
-
-    if name == "list_branches":
-        branches = await gitlab_get(
-            f"/projects/{PROJECT_ID}/repository/branches",
-            params={"per_page": 50},
+        for issue in issues
+    ]
+    return {"issues": payload}
+
+
+async def rest_issue_detail(args: Dict[str, Any]) -> Dict[str, Any]:
+    issue_iid = require_argument(args, "issue_iid")
+    issue = await gitlab_get(f"/projects/{PROJECT_ID}/issues/{issue_iid}")
+    return {
+        "iid": issue["iid"],
+        "title": issue["title"],
+        "state": issue["state"],
+        "description": issue.get("description"),
+        "labels": issue.get("labels", []),
+        "assignees": [
+            assignee.get("username") for assignee in issue.get("assignees", [])
+        ],
+        "web_url": issue["web_url"],
+        "updated_at": issue["updated_at"],
+    }
+
+
+async def rest_pipelines(args: Dict[str, Any]) -> Dict[str, Any]:
+    params = {"per_page": 20, "order_by": "updated_at"}
+    if args.get("ref"):
+        params["ref"] = args["ref"]
+    pipelines = await gitlab_get(f"/projects/{PROJECT_ID}/pipelines", params=params)
+    payload = [
+        {
+            "id": pipeline["id"],
+            "status": pipeline["status"],
+            "ref": pipeline["ref"],
+            "sha": pipeline["sha"],
+            "web_url": pipeline["web_url"],
+            "created_at": pipeline["created_at"],
+        }
+        for pipeline in pipelines
+    ]
+    return {"pipelines": payload}
+
+
+async def rest_pipeline_detail(args: Dict[str, Any]) -> Dict[str, Any]:
+    pipeline_id = require_argument(args, "pipeline_id")
+    return await gitlab_get(f"/projects/{PROJECT_ID}/pipelines/{pipeline_id}")
+
+
+async def rest_branches(args: Dict[str, Any]) -> Dict[str, Any]:
+    branches = await gitlab_get(
+        f"/projects/{PROJECT_ID}/repository/branches",
+        params={"per_page": 50},
+    )
+    payload = [
+        {
+            "name": branch["name"],
+            "commit": branch["commit"]["short_id"],
+            "message": branch["commit"]["title"],
+            "web_url": branch.get("web_url"),
+            "default": branch.get("default", False),
+        }
+        for branch in branches
+    ]
+    return {"branches": payload}
+
+
+async def rest_issue_with_pipelines(args: Dict[str, Any]) -> Dict[str, Any]:
+    require_argument(args, "issue_iid")
+    issue, pipelines = await asyncio.gather(
+        rest_issue_detail(args), rest_pipelines({"ref": args.get("ref")})
+    )
+    return {
+        "issue": issue,
+        "pipelines": related_pipelines(issue, pipelines["pipelines"], args.get("ref")),
+    }
+
+
+# GraphQL backend: one query per tool that asks for exactly the fields the
+# payloads above contain; composite tools are answered by a single query.
+
+ISSUE_FIELDS = (
+    "iid title state webUrl updatedAt "
+    "labels { nodes { title } } assignees { nodes { username } }"
+)
+PIPELINE_FIELDS = "id status ref sha path createdAt"
+PIPELINE_DETAIL_FIELDS = (
+    "id iid status ref sha source path createdAt updatedAt startedAt "
+    "finishedAt duration user { username }"
+)
+
+
+class GraphQLUnavailable(Exception):
+    """GitLab's GraphQL API could not answer; the call falls back to REST."""
+
+
+def graphql_enabled() -> bool:
+    return GITLAB_GRAPHQL and time.time() >= GRAPHQL_STATUS["retry_at"]
+
+
+def graphql_project_path() -> Optional[str]:
+    """GraphQL addresses projects by full path, numeric IDs need the health check."""
+    if not RAW_PROJECT_ID.isdigit():
+        return RAW_PROJECT_ID
+    return HEALTH_STATUS["project"]
+
+
+async def gitlab_graphql(
+    query: str, variables: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Run a query against the configured project and return its `project` field."""
+    path = graphql_project_path()
+    if path is None:
+        raise GraphQLUnavailable("project path not known yet")
+    headers = {"Authorization": f"Bearer {GITLAB_TOKEN}"}
+    body = {"query": query, "variables": {"path": path, **(variables or {})}}
+    try:
+        response = await gitlab_client().post(
+            GITLAB_GRAPHQL_URL, headers=headers, json=body
         )
-        payload = [
-            {
-                "name": branch["name"],
-                "commit": branch["commit"]["short_id"],
-                "message": branch["commit"]["title"],
-                "web_url": branch.get("web_url"),
-                "default": branch.get("default", False),
-            }
-            for branch in branches
+        result = response.json()
+    except (httpx.HTTPError, ValueError) as exc:
+        raise GraphQLUnavailable(f"GitLab GraphQL unreachable: {exc}") from exc
+    if response.status_code >= 400 or result.get("errors"):
+        messages = [error.get("message") for error in result.get("errors") or []]
+        raise GraphQLUnavailable(
+            f"GitLab GraphQL error {response.status_code}: "
+            + ("; ".join(filter(None, messages)) or response.text)
+        )
+    project = (result.get("data") or {}).get("project")
+    if project is None:
+        raise GraphQLUnavailable(f"project {path} not visible to GraphQL")
+    return project
+
+
+def graphql_id(global_id: str) -> int:
+    """`gid://gitlab/Ci::Pipeline/15` -> 15."""
+    return int(global_id.rsplit("/", 1)[-1])
+
+
+def graphql_nodes(connection: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return (connection or {}).get("nodes") or []
+
+
+def graphql_issue(node: Dict[str, Any]) -> Dict[str, Any]:
+    assignees = [user["username"] for user in graphql_nodes(node.get("assignees"))]
+    issue = {
+        "iid": int(node["iid"]),
+        "title": node["title"],
+        "state": node["state"],
+        "labels": [label["title"] for label in graphql_nodes(node.get("labels"))],
+        "assignee": assignees[0] if assignees else None,
+        "web_url": node["webUrl"],
+        "updated_at": node["updatedAt"],
+    }
+    if "description" in node:
+        del issue["assignee"]
+        issue["description"] = node["description"]
+        issue["assignees"] = assignees
+    return issue
+
+
+def graphql_web_base(project: Dict[str, Any]) -> str:
+    """Instance web URL, pipelines only come with a path relative to it."""
+    return project["webUrl"].rsplit(f"/{project['fullPath']}", 1)[0]
+
+
+def graphql_pipeline(node: Dict[str, Any], web_base: str) -> Dict[str, Any]:
+    pipeline = {
+        "id": graphql_id(node["id"]),
+        "status": (node.get("status") or "").lower(),
+        "ref": node.get("ref"),
+        "sha": node.get("sha"),
+        "web_url": f"{web_base}{node['path']}" if node.get("path") else None,
+        "created_at": node.get("createdAt"),
+    }
+    if "finishedAt" in node:
+        pipeline.update(
+            iid=int(node["iid"]) if node.get("iid") else None,
+            source=node.get("source"),
+            updated_at=node.get("updatedAt"),
+            started_at=node.get("startedAt"),
+            finished_at=node.get("finishedAt"),
+            duration=node.get("duration"),
+            user=node.get("user"),
+        )
+    return pipeline
+
+
+OPEN_ISSUES_QUERY = """
+query($path: ID!) {
+  project(fullPath: $path) {
+    issues(state: opened, sort: UPDATED_DESC, first: 20) { nodes { %s } }
+  }
+}
+""" % ISSUE_FIELDS
+
+ISSUE_DETAIL_QUERY = """
+query($path: ID!, $iid: String!) {
+  project(fullPath: $path) {
+    issue(iid: $iid) { %s description }
+  }
+}
+""" % ISSUE_FIELDS
+
+PIPELINES_QUERY = """
+query($path: ID!, $ref: String) {
+  project(fullPath: $path) {
+    fullPath webUrl
+    pipelines(ref: $ref, first: 20) { nodes { %s } }
+  }
+}
+""" % PIPELINE_FIELDS
+
+PIPELINE_DETAIL_QUERY = """
+query($path: ID!, $id: CiPipelineID!) {
+  project(fullPath: $path) {
+    fullPath webUrl
+    pipeline(id: $id) { %s }
+  }
+}
+""" % PIPELINE_DETAIL_FIELDS
+
+ISSUE_WITH_PIPELINES_QUERY = """
+query($path: ID!, $iid: String!, $ref: String) {
+  project(fullPath: $path) {
+    fullPath webUrl
+    issue(iid: $iid) { %s description }
+    pipelines(ref: $ref, first: 20) { nodes { %s } }
+  }
+}
+""" % (
+    ISSUE_FIELDS,
+    PIPELINE_FIELDS,
+)
+
+
+async def graphql_open_issues(args: Dict[str, Any]) -> Dict[str, Any]:
+    project = await gitlab_graphql(OPEN_ISSUES_QUERY)
+    return {
+        "issues": [graphql_issue(node) for node in graphql_nodes(project["issues"])]
+    }
+
+
+async def graphql_issue_detail(args: Dict[str, Any]) -> Dict[str, Any]:
+    issue_iid = require_argument(args, "issue_iid")
+    project = await gitlab_graphql(ISSUE_DETAIL_QUERY, {"iid": str(issue_iid)})
+    if project["issue"] is None:
+        raise HTTPException(status_code=404, detail="GitLab API error: Issue Not Found")
+    return graphql_issue(project["issue"])
+
+
+async def graphql_pipelines(args: Dict[str, Any]) -> Dict[str, Any]:
+    project = await gitlab_graphql(PIPELINES_QUERY, {"ref": args.get("ref") or None})
+    web_base = graphql_web_base(project)
+    return {
+        "pipelines": [
+            graphql_pipeline(node, web_base)
+            for node in graphql_nodes(project["pipelines"])
         ]
-        return as_text_payload({"branches": payload})
+    }
 
-    raise HTTPException(status_code=404, detail=f"Unknown tool: {name}")
 
+async def graphql_pipeline_detail(args: Dict[str, Any]) -> Dict[str, Any]:
+    pipeline_id = require_argument(args, "pipeline_id")
+    project = await gitlab_graphql(
+        PIPELINE_DETAIL_QUERY, {"id": f"gid://gitlab/Ci::Pipeline/{pipeline_id}"}
+    )
+    if project["pipeline"] is None:
+        raise HTTPException(
+            status_code=404, detail="GitLab API error: Pipeline Not Found"
+        )
+    return graphql_pipeline(project["pipeline"], graphql_web_base(project))
 
-@app.get("/health")
-async def health_check():
-    """Basic health endpoint used by Docker."""
+
+async def graphql_issue_with_pipelines(args: Dict[str, Any]) -> Dict[str, Any]:
+    issue_iid = require_argument(args, "issue_iid")
+    project = await gitlab_graphql(
+        ISSUE_WITH_PIPELINES_QUERY,
+        {"iid": str(issue_iid), "ref": args.get("ref") or None},
+    )
+    if project["issue"] is None:
+        raise HTTPException(status_code=404, detail="GitLab API error: Issue Not Found")
+    issue = graphql_issue(project["issue"])
+    web_base = graphql_web_base(project)
+    pipelines = [
+        graphql_pipeline(node, web_base) for node in graphql_nodes(project["pipelines"])
+    ]
+    return {
+        "issue": issue,
+        "pipelines": related_pipelines(issue, pipelines, args.get("ref")),
+    }
+
+
+ToolHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+REST_TOOLS: Dict[str, ToolHandler] = {
+    "list_open_issues": rest_open_issues,
+    "issue_detail": rest_issue_detail,
+    "list_pipelines": rest_pipelines,
+    "pipeline_detail": rest_pipeline_detail,
+    "list_branches": rest_branches,
+    "issue_with_pipelines": rest_issue_with_pipelines,
+}
+
+# list_branches stays on REST: GraphQL only exposes branch names, not commits.
+GRAPHQL_TOOLS: Dict[str, ToolHandler] = {
+    "list_open_issues": graphql_open_issues,
+    "issue_detail": graphql_issue_detail,
+    "list_pipelines": graphql_pipelines,
+    "pipeline_detail": graphql_pipeline_detail,
+    "issue_with_pipelines": graphql_issue_with_pipelines,
+}
+
+
+@app.post("/tools/call", response_model=ToolCallResponse)
+async def call_tool(request: ToolCallRequest):
+    """Execute a GitLab helper tool."""
+    name = request.name
+    args = request.arguments or {}
+
+    if name not in REST_TOOLS:
+        raise HTTPException(status_code=404, detail=f"Unknown tool: {name}")
+
+    if name in GRAPHQL_TOOLS and graphql_enabled():
+        try:
+            payload = await GRAPHQL_TOOLS[name](args)
+        except GraphQLUnavailable as exc:
+            # Try GraphQL again later, answer this and the next calls via REST.
+            GRAPHQL_STATUS["fallbacks"] += 1
+            GRAPHQL_STATUS["last_error"] = str(exc)
+            GRAPHQL_STATUS["retry_at"] = time.time() + GITLAB_GRAPHQL_RETRY
+            print(f"GraphQL failed for {name}, using REST: {exc}", file=sys.stderr)
+        else:
+            GRAPHQL_STATUS["queries"] += 1
+            return as_text_payload(payload)
+
+    return as_text_payload(await REST_TOOLS[name](args))
+
+
+async def refresh_health_status() -> None:
+    """Probe GitLab once and record the outcome in HEALTH_STATUS."""
+    checked_at = time.time()
+    started = time.perf_counter()
     try:
         project = await gitlab_get(f"/projects/{PROJECT_ID}")
-        return {"status": "healthy", "project": project.get("path_with_namespace")}
     except HTTPException as exc:
-        return {"status": "unhealthy", "detail": exc.detail}
+        HEALTH_STATUS.update(status="unhealthy", detail=exc.detail)
+    except httpx.HTTPError as exc:
+        HEALTH_STATUS.update(status="unhealthy", detail=f"GitLab unreachable: {exc}")
+    else:
+        HEALTH_STATUS.update(
+            status="healthy",
+            project=project.get("path_with_namespace"),
+            detail=None,
+            last_success=checked_at,
+        )
+    HEALTH_STATUS["last_check"] = checked_at
+    HEALTH_STATUS["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+
+async def health_refresher() -> None:
+    """Keep the health snapshot current for the lifetime of the service."""
+    while True:
+        await refresh_health_status()
+        await asyncio.sleep(GITLAB_HEALTH_INTERVAL)
+
+
+def health_snapshot() -> Dict[str, Any]:
+    """Return the cached health status plus readiness derived from its age."""
+    snapshot = dict(HEALTH_STATUS)
+    last_success = snapshot["last_success"]
+    snapshot["ready"] = (
+        last_success is not None and time.time() - last_success <= GITLAB_HEALTH_MAX_AGE
+    )
+    snapshot["graphql"] = {
+        key: value for key, value in GRAPHQL_STATUS.items() if key != "retry_at"
+    }
+    return snapshot
+
+
+@app.on_event("startup")
+async def start_health_refresher():
+    global HEALTH_TASK
+    HEALTH_TASK = asyncio.create_task(health_refresher())
+
+
+@app.on_event("shutdown")
+async def stop_health_refresher():
+    if HEALTH_TASK:
+        HEALTH_TASK.cancel()
+    if HTTP_CLIENT:
+        await HTTP_CLIENT.aclose()
+
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe served from the background-refreshed snapshot."""
+    snapshot = health_snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+
+@app.get("/health")
+async def health_check():
+    """Cached GitLab health status (kept for existing clients)."""
+    return health_snapshot()
 
 
 if __name__ == "__main__":
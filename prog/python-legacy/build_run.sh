@@ -1,2 +1,5 @@
 docker build -t docbuc/python-legacy .
 docker run -v "$(pwd)":/src/out -u "$(id -u):$(id -g)" docbuc/python-legacy
+# time-lapse: one frame every 5 minutes for a day, frames in ./frames
+# docker run -v "$(pwd)":/src/out -u "$(id -u):$(id -g)" docbuc/python-legacy \
+#   python main.py --start 2018-03-20 --step 5
@@ -3,16 +3,223 @@ matplotlib.use('Agg')
 import numpy as np
 from mpl_toolkits.basemap import Basemap
 import matplotlib.pyplot as plt
-from datetime import datetime
-plt.figure(figsize=(10.24, 7.68), dpi=100)
-map = Basemap(projection='merc',llcrnrlat=-80,urcrnrlat=80,\
-    llcrnrlon=-180,urcrnrlon=180,lat_ts=20,resolution='c')
-map.drawcoastlines()
-map.drawparallels(np.arange(-90,90,30),labels=[1,0,0,0])
-map.drawmapboundary(fill_color='aqua')
-map.fillcontinents(color='coral',lake_color='aqua')
-date = datetime.utcnow()
-CS=map.nightshade(date)
-plt.title('Tag und Nacht am %s (UTC)' % date.strftime("%d %b %Y %H:%M:%S"))
-plt.savefig('/src/out/tag_nacht.png')
+from datetime import datetime, timedelta
+from multiprocessing import Pool, cpu_count
+import argparse, calendar, os, sys, time
 
+OUT = os.environ.get('OUT', '/src/out/tag_nacht.png')
+# projection data and rasterized base map are kept here between runs
+CACHE_DIR = os.environ.get('CACHE_DIR', '/src/out/.cache')
+FIGSIZE, DPI = (10.24, 7.68), 100
+# bump when the look of the base layer changes, old cache files are ignored
+CACHE_VERSION = 2
+# frames per worker task; their night masks are computed in one go
+CHUNK = 8
+
+def cache_file(name):
+    return os.path.join(CACHE_DIR, '%s-v%d' % (name, CACHE_VERSION))
+
+def make_map():
+    return Basemap(projection='merc',llcrnrlat=-80,urcrnrlat=80,\
+        llcrnrlon=-180,urcrnrlon=180,lat_ts=20,resolution='c')
+
+def render_base():
+    """Draw everything that does not depend on the time, once.
+
+    Returns the figure as RGBA pixels, the pixel window covered by the map
+    and the longitude of every window column and latitude of every row.
+    """
+    fig = plt.figure(figsize=FIGSIZE, dpi=DPI)
+    ax = fig.add_subplot(111)
+    map = make_map()
+    map.drawcoastlines(ax=ax)
+    map.drawparallels(np.arange(-90,90,30),labels=[1,0,0,0],ax=ax)
+    map.drawmapboundary(fill_color='aqua',ax=ax)
+    map.fillcontinents(color='coral',lake_color='aqua',ax=ax)
+    fig.canvas.draw()
+    width, height = fig.canvas.get_width_height()
+    base = np.frombuffer(fig.canvas.buffer_rgba(), np.uint8).reshape(
+        height, width, 4).copy()
+    # the axes box after aspect correction, in pixels with row 0 at the top
+    x0, y0, w, h = ax.get_position().bounds
+    left, right = x0 * width, (x0 + w) * width
+    top, bottom = (1 - y0 - h) * height, (1 - y0) * height
+    window = np.array([int(round(top)), int(round(bottom)),
+                       int(round(left)), int(round(right))])
+    # map coordinates of the pixel centres, then back to lon/lat; Mercator is
+    # cylindrical, so longitude depends on the column and latitude on the row
+    cols = np.arange(window[2], window[3]) + 0.5
+    rows = np.arange(window[0], window[1]) + 0.5
+    xs = map.xmin + (cols - left) / (right - left) * (map.xmax - map.xmin)
+    ys = map.ymax - (rows - top) / (bottom - top) * (map.ymax - map.ymin)
+    lons = map(xs, np.zeros_like(xs), inverse=True)[0]
+    lats = map(np.zeros_like(ys), ys, inverse=True)[1]
+    plt.close(fig)
+    return base, window, lons, lats
+
+def load_base():
+    """Return (base image, map window, lons, lats), cached on disk."""
+    path = cache_file('base') + '.npz'
+    try:
+        cache = np.load(path)
+        return cache['base'], cache['window'], cache['lons'], cache['lats']
+    except (IOError, OSError, KeyError, ValueError):
+        pass
+    base, window, lons, lats = render_base()
+    try:
+        if not os.path.isdir(CACHE_DIR):
+            os.makedirs(CACHE_DIR)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, base=base, window=window, lons=lons, lats=lats)
+        os.rename(path + '.tmp', path)
+    except (IOError, OSError) as e:
+        sys.stderr.write('cannot cache base map: %s\n' % e)
+    return base, window, lons, lats
+
+def sun_positions(stamps):
+    """Greenwich hour angle and declination in degrees for UNIX timestamps.
+
+    The formulas of mpl_toolkits.basemap.solar.epem, evaluated for all
+    timestamps at once.
+    """
+    stamps = np.asarray(stamps, float)
+    ut = (stamps % 86400) / 3600.
+    t = (np.floor(stamps / 86400. + 2440587.5) + ut / 24. - 2451545.0) / 36525.
+    l = (280.460 + 36000.770 * t) % 360
+    g = np.radians(357.528 + 35999.050 * t)
+    lm = np.radians(l + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g))
+    ep = np.radians(23.4393 - 0.01300 * t)
+    eqtime = (-1.915 * np.sin(g) - 0.020 * np.sin(2 * g) +
+              2.466 * np.sin(2 * lm) - 0.053 * np.sin(4 * lm))
+    gha = 15 * ut - 180 + eqtime
+    dec = np.degrees(np.arcsin(np.sin(ep) * np.sin(lm)))
+    return gha, dec
+
+def night_masks(stamps, lons, lats):
+    """Boolean (frame, row, column) masks, True where the sun is down."""
+    gha, dec = sun_positions(stamps)
+    dec = np.radians(dec)[:, None, None]
+    lat = np.radians(lats)[None, :, None]
+    hour = np.cos(np.radians(lons[None, None, :] + gha[:, None, None]))
+    # cosine of the solar zenith angle is negative below the horizon
+    return (np.sin(lat) * np.sin(dec) + np.cos(lat) * np.cos(dec) * hour) < 0
+
+class Renderer(object):
+    """One figure reused for every frame, only pixels and title change."""
+
+    def __init__(self):
+        self.base, self.window, self.lons, self.lats = load_base()
+        height, width = self.base.shape[:2]
+        top, bottom, left, right = self.window
+        self.fig = plt.figure(figsize=FIGSIZE, dpi=DPI)
+        self.image = self.fig.figimage(self.base, xo=0, yo=0, origin='upper', zorder=-1)
+        # empty axes over the map, only there to place the title as before
+        ax = self.fig.add_axes([float(left) / width, 1 - float(bottom) / height,
+                                float(right - left) / width, float(bottom - top) / height])
+        ax.set_axis_off()
+        self.title = ax.set_title('')
+
+    def render(self, stamp, night, out):
+        frame = self.base.copy()
+        top, bottom, left, right = self.window
+        region = frame[top:bottom, left:right, :3]
+        # black at alpha 0.5, as Basemap.nightshade draws it
+        region[night] //= 2
+        self.image.set_data(frame)
+        date = datetime.utcfromtimestamp(stamp)
+        self.title.set_text('Tag und Nacht am %s (UTC)' % date.strftime("%d %b %Y %H:%M:%S"))
+        self.fig.savefig(out, dpi=DPI)
+
+renderer = None
+
+def init_worker():
+    global renderer
+    renderer = Renderer()
+
+def render_chunk(task):
+    """Render a list of (index, timestamp, path) frames, return timings."""
+    start = time.time()
+    masks = night_masks([stamp for index, stamp, path in task],
+                        renderer.lons, renderer.lats)
+    mask_time = (time.time() - start) / len(task)
+    timings = []
+    for (index, stamp, path), night in zip(task, masks):
+        start = time.time()
+        renderer.render(stamp, night, path)
+        timings.append((index, path, mask_time, time.time() - start))
+    return timings
+
+def parse_time(text):
+    for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError('expected YYYY-MM-DD[THH:MM[:SS]] (UTC): %s' % text)
+
+def write_gif(paths, out, duration):
+    try:
+        from PIL import Image
+    except ImportError:
+        sys.stderr.write('--gif needs Pillow (pip install pillow), frames are kept\n')
+        return
+    frames = [Image.open(path).convert('RGB').quantize() for path in paths]
+    frames[0].save(out, save_all=True, append_images=frames[1:],
+                   duration=duration, loop=0)
+
+def batch(args):
+    date, step = args.start, timedelta(minutes=args.step)
+    end = args.end or date + timedelta(days=1)
+    stamps = []
+    while date <= end:
+        stamps.append(calendar.timegm(date.utctimetuple()))
+        date += step
+    if not os.path.isdir(args.frames):
+        os.makedirs(args.frames)
+    frames = [(index, stamp, os.path.join(args.frames, 'frame-%05d.png' % index))
+              for index, stamp in enumerate(stamps)]
+    tasks = [frames[i:i + CHUNK] for i in range(0, len(frames), CHUNK)]
+
+    # build the cache before forking, the workers then only read it
+    load_base()
+    started = time.time()
+    pool = Pool(args.workers or cpu_count(), initializer=init_worker)
+    try:
+        for timings in pool.imap_unordered(render_chunk, tasks):
+            for index, path, mask_time, render_time in timings:
+                sys.stderr.write('%s  mask %.1fms  render %.1fms\n' % (
+                    path, mask_time * 1000, render_time * 1000))
+    finally:
+        pool.close()
+        pool.join()
+    elapsed = time.time() - started
+    sys.stderr.write('%d frames in %.2fs, %.1f frames/s\n' % (
+        len(frames), elapsed, len(frames) / elapsed))
+    if args.gif:
+        write_gif([path for index, stamp, path in frames], args.gif, args.gif_ms)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Day/night world map, a single frame or a time-lapse series.')
+    parser.add_argument('--start', type=parse_time,
+                        help='first frame (UTC), switches to the batch mode')
+    parser.add_argument('--end', type=parse_time, help='last frame (default: start + 1 day)')
+    parser.add_argument('--step', type=float, default=10, help='minutes between frames')
+    parser.add_argument('--workers', type=int, default=0, help='processes (default: CPUs)')
+    parser.add_argument('--frames', default=os.path.join(os.path.dirname(OUT), 'frames'),
+                        help='directory for the frame sequence')
+    parser.add_argument('--gif', help='also write an animated GIF (needs Pillow)')
+    parser.add_argument('--gif-ms', type=int, default=80, help='GIF frame duration')
+    args = parser.parse_args()
+    if args.start:
+        return batch(args)
+
+    start = time.time()
+    init_worker()
+    loaded = time.time()
+    index, path, mask_time, render_time = render_chunk([(0, time.time(), OUT)])[0]
+    sys.stderr.write('base %.3fs, mask %.3fs, frame %.3fs\n' % (
+        loaded - start, mask_time, render_time))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+
+# usage: make_feed.py [entries] > large.xml
+#   writes a synthetic Atom archive, newest entry first, one entry per
+#   10 minutes back from 2026-03-02; 20000 entries are about 10 MB. Entries
+#   are written as they are generated, so any size can be produced.
+
+import sys, time
+
+ENTRIES = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+NEWEST = 1772445600  # 2026-03-02T10:00:00Z
+FILLER = ' '.join(['Lorem ipsum dolor sit amet, consectetur adipiscing elit.'] * 4)
+
+out = sys.stdout
+out.write('<?xml version="1.0" encoding="utf-8"?>\n'
+          '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+          '  <title>Synthetic archive</title>\n'
+          '  <id>urn:fixture:archive</id>\n'
+          '  <updated>%s</updated>\n' % time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(NEWEST)))
+for n in range(ENTRIES):
+  stamp = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(NEWEST - n * 600))
+  out.write('  <entry>\n'
+            '    <title>Archive story %d</title>\n'
+            '    <id>https://example.net/archive/%d</id>\n'
+            '    <link href="https://example.net/archive/%d"/>\n'
+            '    <published>%s</published>\n'
+            '    <updated>%s</updated>\n'
+            '    <summary>%s</summary>\n'
+            '  </entry>\n' % (n, n, n, stamp, stamp, FILLER))
+out.write('</feed>\n')
@@ -1,11 +1,217 @@
 #!/usr/bin/env python3
 
+# usage: printheadlines.py [feed-url ...]
+#   feeds are fetched concurrently (FETCH_WORKERS at a time) and cached in
+#   FEED_CACHE_DIR; unchanged feeds are revalidated with ETag/Last-Modified
+#   and cost a 304. Headlines of all feeds are merged newest first, with
+#   entries that appear in several feeds printed once.
+#
+#   FEED_MAX_ENTRIES=N prints only the newest N headlines, FEED_SINCE=2026-03-01
+#   (or 2026-03-01T12:00:00Z) only those published since then.
+#
+#   FEED_STREAM=1 is meant for large archives: instead of building the whole
+#   document with feedparser, entries are read one at a time with an
+#   incremental XML parser and dropped after printing, so memory stays flat
+#   whatever the size of the feed. Feeds are expected newest first, reading
+#   stops at the first entry older than FEED_SINCE or after FEED_MAX_ENTRIES.
+#
+#   local test with the fixture feeds:
+#     (cd fixtures && python -m http.server 8000 &)
+#     python printheadlines.py http://localhost:8000/a.xml http://localhost:8000/b.xml
+#
+#   and with a large synthetic archive (20000 entries, about 10 MB):
+#     python fixtures/make_feed.py 20000 > fixtures/large.xml
+#     FEED_STREAM=1 FEED_MAX_ENTRIES=50 python printheadlines.py http://localhost:8000/large.xml
+
 import feedparser
-import time
+import calendar, collections, email.utils, hashlib, heapq, itertools, json, os, shutil, sys, tempfile, time
+import urllib.error, urllib.request
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+FEEDS = sys.argv[1:] or os.environ.get(
+  'FEEDS', 'https://www.heise.de/newsticker/heise-atom.xml').split()
+FETCH_WORKERS = int(os.environ.get('FETCH_WORKERS', '8'))
+FETCH_TIMEOUT = float(os.environ.get('FETCH_TIMEOUT', '10'))
+CACHE_DIR = os.environ.get(
+  'FEED_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'printheadlines'))
+STREAM = os.environ.get('FEED_STREAM', '').lower() in ('1', 'true', 'yes')
+MAX_ENTRIES = int(os.environ.get('FEED_MAX_ENTRIES', '0')) or None
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+ENTRY_TAGS = (ATOM + 'entry', 'item')
+# a story carried by several feeds is dated within this many seconds
+DEDUP_WINDOW = 86400
+
+def parse_time(text):
+  """RFC 3339 (Atom) or RFC 822 (RSS) date as UTC struct_time, like feedparser."""
+  text = (text or '').strip()
+  if not text:
+    return None
+  try:
+    stamp = datetime.fromisoformat(text.replace('Z', '+00:00'))
+  except ValueError:
+    try:
+      stamp = email.utils.parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+      return None
+  if stamp.tzinfo is None:
+    stamp = stamp.replace(tzinfo=timezone.utc)
+  return stamp.utctimetuple()
+
+SINCE = parse_time(os.environ.get('FEED_SINCE'))
+if os.environ.get('FEED_SINCE') and SINCE is None:
+  sys.exit('FEED_SINCE: expected a date like 2026-03-01 or 2026-03-01T12:00:00Z')
+
+def cache_paths(url):
+  key = hashlib.sha256(url.encode()).hexdigest()[:32]
+  return (os.path.join(CACHE_DIR, key + '.xml'),
+          os.path.join(CACHE_DIR, key + '.json'))
+
+def fetch(url):
+  """Return the path of the cached feed body, refreshed unless the server says 304."""
+  body_path, meta_path = cache_paths(url)
+  meta = {}
+  if os.path.exists(body_path) and os.path.exists(meta_path):
+    with open(meta_path) as f:
+      meta = json.load(f)
+  request = urllib.request.Request(url, headers={'User-Agent': 'printheadlines'})
+  if meta.get('etag'):
+    request.add_header('If-None-Match', meta['etag'])
+  if meta.get('last_modified'):
+    request.add_header('If-Modified-Since', meta['last_modified'])
+  os.makedirs(CACHE_DIR, exist_ok=True)
+  try:
+    with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+      # copied in chunks, a large archive is never held in memory as a whole
+      with open(body_path + '.tmp', 'wb') as f:
+        shutil.copyfileobj(response, f)
+      meta = {'etag': response.headers.get('ETag'),
+              'last_modified': response.headers.get('Last-Modified')}
+  except urllib.error.HTTPError as e:
+    if e.code != 304:
+      raise
+    return body_path, 'cached'
+  # write to temp files and rename, so a concurrent run never reads half a file
+  with open(meta_path + '.tmp', 'w') as f:
+    json.dump(meta, f)
+  os.replace(body_path + '.tmp', body_path)
+  os.replace(meta_path + '.tmp', meta_path)
+  return body_path, 'fetched'
+
+def download(url):
+  try:
+    return fetch(url)
+  except (OSError, ValueError) as e:
+    print('! %s: %s' % (url, e), file=sys.stderr)
+    return None, None
+
+def entry_time(entry):
+  return entry.get('published_parsed') or entry.get('updated_parsed')
+
+def recent(entry):
+  return entry_time(entry) and not (SINCE and entry_time(entry) < SINCE)
 
-feed = feedparser.parse("https://www.heise.de/newsticker/heise-atom.xml")
+def load(url):
+  """Fetch and parse one feed with feedparser, newest entries first."""
+  path, how = download(url)
+  if path is None:
+    return []
+  entries = feedparser.parse(path).entries
+  print('# %s: %d entries (%s)' % (url, len(entries), how), file=sys.stderr)
+  return sorted(filter(recent, entries), key=entry_time, reverse=True)
 
-[ print("* [%s]: %s" %
-    (time.strftime("%Y-%m-%d %H:%M:%S", entry.published_parsed),
+def child_text(elem, *tags):
+  for tag in tags:
+    child = elem.find(tag)
+    if child is not None and child.text and child.text.strip():
+      return child.text.strip()
+  return None
+
+def read_entry(elem):
+  """The fields of an Atom entry or RSS item that feedparser would give us."""
+  entry = feedparser.FeedParserDict(
+    title=child_text(elem, ATOM + 'title', 'title') or '',
+    id=child_text(elem, ATOM + 'id', 'guid'),
+    link=child_text(elem, 'link'),
+    published_parsed=parse_time(child_text(elem, ATOM + 'published', 'pubDate')),
+    updated_parsed=parse_time(child_text(elem, ATOM + 'updated')))
+  for link in elem.iterfind(ATOM + 'link'):
+    if link.get('rel', 'alternate') == 'alternate':
+      entry['link'] = link.get('href')
+      break
+  return entry
+
+def iter_entries(path):
+  """Yield the entries of an Atom or RSS file one at a time.
+
+  Every entry is removed from the tree once it is read, so the parser only
+  ever holds the entry it is working on.
+  """
+  parents = []
+  for event, elem in ET.iterparse(path, events=('start', 'end')):
+    if event == 'start':
+      parents.append(elem)
+      continue
+    parents.pop()
+    if elem.tag in ENTRY_TAGS:
+      entry = read_entry(elem)
+      if parents:
+        parents[-1].remove(elem)
+      yield entry
+
+def stream(url, path, how):
+  """Entries of one feed in document order, stopping as early as possible."""
+  count = 0
+  try:
+    for entry in iter_entries(path):
+      if not entry_time(entry):
+        continue
+      if SINCE and entry_time(entry) < SINCE:
+        break
+      count += 1
+      yield entry
+      if count == MAX_ENTRIES:
+        break
+  except ET.ParseError as e:
+    print('! %s: %s' % (url, e), file=sys.stderr)
+  finally:
+    print('# %s: %d entries read (%s, streamed)' % (url, count, how), file=sys.stderr)
+
+def merged(feeds, window=None):
+  """Yield the entries of all feeds newest first, each story only once.
+
+  With a window (seconds), only stories published that close to the current
+  entry are remembered for the duplicate check, so it does not grow with
+  the length of the feeds.
+  """
+  seen, remembered = set(), collections.deque()
+  for entry in heapq.merge(*feeds, key=entry_time, reverse=True):
+    key = entry.get('id') or entry.get('link') or entry.get('title')
+    if key in seen:
+      continue
+    seen.add(key)
+    if window:
+      stamp = calendar.timegm(entry_time(entry))
+      remembered.append((stamp, key))
+      while remembered[0][0] - stamp > window:
+        seen.discard(remembered.popleft()[1])
+    yield entry
+
+with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+  if STREAM:
+    feeds = [stream(url, path, how)
+             for url, (path, how) in zip(FEEDS, pool.map(download, FEEDS))
+             if path is not None]
+  else:
+    feeds = list(pool.map(load, FEEDS))
+
+for entry in itertools.islice(merged(feeds, DEDUP_WINDOW if STREAM else None), MAX_ENTRIES):
+  print("* [%s]: %s" %
+    (time.strftime("%Y-%m-%d %H:%M:%S", entry_time(entry)),
      entry.title))
-    for entry in feed.entries ]
+
+if STREAM:
+  for feed in feeds:
+    feed.close()